@@ -0,0 +1,175 @@
+"""Outlier and safe-band detection over the columnar cache.
+
+``detect()`` flags rows of the numeric columns under three rules:
+
+* ``zscore``: further than ANOMALY_ZSCORE sample standard deviations from
+  the column mean;
+* ``iqr``: outside ``[Q1 - k * IQR, Q3 + k * IQR]`` with k = ANOMALY_IQR_K;
+* ``threshold``: outside the configured band for the row's Type
+  (ANOMALY_THRESHOLDS).
+
+Every rule reduces to a lower and upper bound per row, so flagging a column
+is two vectorized comparisons over its memory-mapped values; per-Type bands
+are gathered from small lookup tables by the int32 Type codes. Flagged rows
+are stored as sorted int32 row indices under
+``columns/<hash>/anomalies-<config digest>/`` (raw ``.bin`` files plus a
+``manifest.json`` with bounds and counts, like the columns themselves), so a
+configuration change simply computes a new set. Nothing here needs the
+database.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.conf import settings
+
+from .columnar import column_dir, load_columns
+from .utils import NUMERIC_COLS
+
+RULES = ('zscore', 'iqr', 'threshold')
+ANY = 'any'
+INDEX_DTYPE = '<i4'
+MANIFEST = 'manifest.json'
+
+
+def detection_config():
+    """The configured rules as a JSON-serializable dict (read lazily from settings)."""
+    thresholds = {
+        str(t): {col: [None if v is None else float(v) for v in band] for col, band in bands.items()}
+        for t, bands in (settings.ANOMALY_THRESHOLDS or {}).items()
+    }
+    return {'zscore': float(settings.ANOMALY_ZSCORE), 'iqr': float(settings.ANOMALY_IQR_K), 'thresholds': thresholds}
+
+
+def config_digest(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _band_tables(thresholds, column, categories):
+    """Lower/upper bound per Type code for ``column``; the extra last slot is code -1 (no Type)."""
+    low = np.full(len(categories) + 1, -np.inf)
+    high = np.full(len(categories) + 1, np.inf)
+    default = thresholds.get('*', {}).get(column)
+    if default:
+        low[:] = -np.inf if default[0] is None else default[0]
+        high[:] = np.inf if default[1] is None else default[1]
+    for code, name in enumerate(categories):
+        band = thresholds.get(name, {}).get(column)
+        if band:
+            low[code] = -np.inf if band[0] is None else band[0]
+            high[code] = np.inf if band[1] is None else band[1]
+    return low, high
+
+
+def _flag(values, low, high):
+    # NaNs compare False on both sides, so missing values are never flagged.
+    return np.flatnonzero((values < low) | (values > high)).astype(INDEX_DTYPE)
+
+
+def detect(columns, types=None, config=None):
+    """Flag rows of ``columns`` (name -> 1-D array) under the configured rules.
+
+    ``types`` is an optional ``pd.Categorical`` of per-row Types for the
+    threshold rule and the per-Type counts. Returns ``(manifest, flagged)``
+    where ``flagged`` maps ``'<rule>.<column>'`` and ``'any'`` to int32 row
+    indices.
+    """
+    config = config or detection_config()
+    thresholds = config['thresholds']
+    rows = len(next(iter(columns.values()))) if columns else 0
+    if rows >= 2 ** 31:
+        raise ValueError("Too many rows for int32 row indices")
+    categories = [] if types is None else [str(c) for c in types.categories]
+    codes = None if types is None else np.asarray(types.codes, dtype=INDEX_DTYPE)
+    banded = {col for bands in thresholds.values() for col in bands}
+
+    flagged = {}
+    rules = {rule: {} for rule in RULES}
+    any_mask = np.zeros(rows, dtype=bool)
+    for col in NUMERIC_COLS:
+        if col not in columns:
+            continue
+        values = np.asarray(columns[col], dtype='float64')
+        present = values[~np.isnan(values)]
+        if present.size > 1:
+            mean, std = present.mean(), present.std(ddof=1)
+            q1, q3 = np.percentile(present, [25, 75])
+            bounds = {
+                'zscore': (mean - config['zscore'] * std, mean + config['zscore'] * std),
+                'iqr': (q1 - config['iqr'] * (q3 - q1), q3 + config['iqr'] * (q3 - q1)),
+            }
+            for rule, (low, high) in bounds.items():
+                flagged[f'{rule}.{col}'] = _flag(values, low, high)
+                rules[rule][col] = {'low': float(low), 'high': float(high), 'count': len(flagged[f'{rule}.{col}'])}
+        if col in banded:
+            low, high = _band_tables(thresholds, col, categories)
+            if codes is None:
+                low, high = low[-1], high[-1]
+            else:
+                low, high = low[codes], high[codes]
+            flagged[f'threshold.{col}'] = _flag(values, low, high)
+            rules['threshold'][col] = {'count': len(flagged[f'threshold.{col}'])}
+    for indices in flagged.values():
+        any_mask[indices] = True
+    flagged[ANY] = np.flatnonzero(any_mask).astype(INDEX_DTYPE)
+
+    by_type = {}
+    if codes is not None and len(flagged[ANY]):
+        # Shift by one so rows without a Type (code -1) land in bin 0.
+        counts = np.bincount(codes[flagged[ANY]] + 1, minlength=len(categories) + 1)
+        by_type = {name: int(n) for name, n in zip(['', *categories], counts.tolist()) if n}
+        by_type = dict(sorted(by_type.items(), key=lambda kv: kv[1], reverse=True))
+    manifest = {
+        'rows': rows,
+        'flagged': len(flagged[ANY]),
+        'config': config,
+        'rules': {rule: cols for rule, cols in rules.items() if cols},
+        'by_type': by_type,
+        'keys': sorted(flagged),
+    }
+    return manifest, flagged
+
+
+def anomalies_dir(content_hash, config, media_root=None):
+    return column_dir(content_hash, media_root) / f'anomalies-{config_digest(config)}'
+
+
+def ensure_anomalies(content_hash, config=None, media_root=None):
+    """Manifest of the dataset's flagged rows, detecting and storing them on first use.
+
+    The dataset's columnar cache must exist (see ``columnar.ensure_columns``).
+    """
+    config = config or detection_config()
+    directory = anomalies_dir(content_hash, config, media_root)
+    if (directory / MANIFEST).exists():
+        return read_anomalies(content_hash, config, media_root)
+    columns = load_columns(content_hash, media_root=media_root)
+    types = columns.pop('Type', None)
+    manifest, flagged = detect(columns, types, config)
+    tmp = tempfile.mkdtemp(prefix=f'{directory.name}.', suffix='.tmp', dir=directory.parent)
+    try:
+        for key, indices in flagged.items():
+            indices.tofile(os.path.join(tmp, f'{key}.bin'))
+        with open(os.path.join(tmp, MANIFEST), 'w') as fh:
+            json.dump(manifest, fh)
+        os.rename(tmp, directory)
+    except OSError:
+        # Another job already stored the same result.
+        shutil.rmtree(tmp, ignore_errors=True)
+    return manifest
+
+
+def read_anomalies(content_hash, config=None, media_root=None):
+    with open(anomalies_dir(content_hash, config or detection_config(), media_root) / MANIFEST) as fh:
+        return json.load(fh)
+
+
+def load_flagged(content_hash, key, config=None, media_root=None):
+    """Memory-mapped int32 row indices flagged under ``key`` (``'any'`` or ``'<rule>.<column>'``)."""
+    path = anomalies_dir(content_hash, config or detection_config(), media_root) / f'{key}.bin'
+    if not path.stat().st_size:
+        return np.empty(0, dtype=INDEX_DTYPE)
+    return np.memmap(path, dtype=INDEX_DTYPE, mode='r')
@@ -0,0 +1,57 @@
+"""DRF views with coroutine handlers, for the ASGI serving path.
+
+DRF's ``APIView`` only dispatches to synchronous handlers. ``AsyncAPIView``
+runs DRF's request setup (authentication, permissions, throttling, content
+negotiation) through ``sync_to_async`` and then awaits the handler, so an
+I/O-bound request holds no worker thread while it waits on the database,
+the disk or a slow client.
+"""
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose HTTP handlers are ``async def``.
+
+    Under WSGI Django runs these views through ``async_to_sync``, which
+    works but adds an event loop per request, so they are only routed when
+    ASYNC_VIEWS is on.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+async def aiter_blocks(iterator):
+    """Async iterator over a blocking byte iterator, advanced on the executor.
+
+    Django's ASGI handler buffers a synchronous streaming response into a
+    list before sending it; this lets file and gzip streams go out block by
+    block instead.
+    """
+    advance = sync_to_async(partial(next, iterator, None), thread_sensitive=False)
+    while True:
+        block = await advance()
+        if block is None:
+            return
+        yield block
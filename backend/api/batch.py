@@ -0,0 +1,223 @@
+"""Batch ingestion: many CSVs (or zip archives of CSVs) summarized in parallel
+across CPU cores with a process pool."""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from . import metrics
+from .anomalies import detection_config
+from .httpcache import invalidate_dataset
+from .jobs import get_executor
+from .models import Dataset
+from .pipeline import summarize_file
+from .retention import apply_retention
+from .schema import configured_options
+from .utils import uploaded_sha256
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+ORIGINAL_DELETED = "The identical dataset this upload matched was deleted; upload the file again."
+
+
+class BatchError(ValueError):
+    pass
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.BATCH_WORKERS or os.cpu_count())
+        return _pool
+
+
+def _is_zip(f):
+    return f.name.lower().endswith('.zip')
+
+
+def _open_zip(archive):
+    """The archive and its CSV members; BatchError if it is not a usable zip."""
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise BatchError(f"{archive.name} is not a valid zip archive")
+    members = [m for m in zf.infolist() if not m.is_dir() and m.filename.lower().endswith('.csv')
+               and not m.filename.startswith('__MACOSX/')]
+    if sum(m.file_size for m in members) > settings.BATCH_MAX_UNCOMPRESSED_BYTES:
+        zf.close()
+        raise BatchError(f"{archive.name} expands beyond BATCH_MAX_UNCOMPRESSED_BYTES")
+    return zf, members
+
+
+def _extract_zip(archive, workdir):
+    """Yield (name, File) for every CSV member, hashed while extracting."""
+    zf, members = _open_zip(archive)
+    with zf:
+        for member in members:
+            h = hashlib.sha256()
+            target = os.path.join(workdir, f'{len(os.listdir(workdir))}.csv')
+            try:
+                with zf.open(member) as src, open(target, 'wb') as dst:
+                    for block in iter(lambda: src.read(1024 * 1024), b''):
+                        h.update(block)
+                        dst.write(block)
+            except (zipfile.BadZipFile, zlib.error) as exc:
+                raise BatchError(f"{archive.name}: {member.filename} is corrupt ({exc})")
+            name = os.path.basename(member.filename)
+            with open(target, 'rb') as fh:
+                fileobj = File(fh, name=name)
+                fileobj.content_hash = h.hexdigest()
+                yield name, fileobj
+
+
+def _expand(files, workdir):
+    for f in files:
+        if _is_zip(f):
+            yield from _extract_zip(f, workdir)
+        else:
+            if not getattr(f, 'content_hash', None):
+                f.content_hash = uploaded_sha256(f)
+            yield f.name, f
+
+
+def ingest_batch(files):
+    """Store every CSV in ``files`` and return one result dict per CSV.
+
+    Duplicates (of stored datasets or of earlier files in the batch) share the
+    stored file and are marked with ``duplicate_of``; the rest are created as
+    pending and must be summarized with ``process_batch``. Archives are checked
+    before anything is stored, and if a file still fails (e.g. a corrupt zip
+    member) the datasets created so far are removed again, so a rejected batch
+    leaves nothing pending.
+    """
+    for f in files:
+        if _is_zip(f):
+            _open_zip(f)[0].close()
+            f.seek(0)
+    results = []
+    by_hash = {}
+    workdir = tempfile.mkdtemp(prefix='batch-')
+    try:
+        for name, f in _expand(files, workdir):
+            original = by_hash.get(f.content_hash) or Dataset.objects.filter(
+                content_hash=f.content_hash, status=Dataset.READY).order_by('-uploaded_at').first()
+            if original:
+                ds = Dataset.objects.create(file=original.file.name, file_size=original.file_size, original_filename=name,
+                                            content_hash=f.content_hash, status=Dataset.PENDING)
+                results.append({'filename': name, 'id': ds.id, 'duplicate_of': original.id})
+            else:
+                ds = Dataset.objects.create(file=f, file_size=f.size, original_filename=name,
+                                            content_hash=f.content_hash, status=Dataset.PENDING)
+                by_hash[f.content_hash] = ds
+                results.append({'filename': name, 'id': ds.id})
+    except BaseException:
+        Dataset.objects.filter(pk__in=[r['id'] for r in results]).delete()
+        for ds in by_hash.values():
+            default_storage.delete(ds.file.name)
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def process_batch(results):
+    """Summarize the batch's pending datasets on the process pool, then store every
+    summary and apply retention in one transaction.
+
+    Any unexpected error marks the batch's datasets that are still in flight
+    as failed, so none of them stays pending.
+    """
+    try:
+        _process_batch(results)
+    except Exception as exc:
+        logger.exception("Batch processing failed")
+        ids = [r['id'] for r in results]
+        Dataset.objects.filter(pk__in=ids, status__in=(Dataset.PENDING, Dataset.PROCESSING)).update(
+            status=Dataset.FAILED, error=str(exc))
+        for ds_id in ids:
+            invalidate_dataset(ds_id)
+    rows = {pk: (st, err) for pk, st, err in Dataset.objects.filter(
+        pk__in=[r['id'] for r in results]).values_list('id', 'status', 'error')}
+    for result in results:
+        result['status'], error = rows.get(result['id'], ('deleted', ''))
+        if error:
+            result['error'] = error
+    return results
+
+
+def _process_batch(results):
+    pending = Dataset.objects.in_bulk([r['id'] for r in results if 'duplicate_of' not in r])
+    Dataset.objects.filter(pk__in=pending).update(status=Dataset.PROCESSING)
+    for ds_id in pending:
+        invalidate_dataset(ds_id)
+    pool = get_pool()
+    options = configured_options()
+    anomalies = detection_config() if settings.ANOMALY_DETECTION else None
+    futures, summaries, failures = {}, {}, {}
+    with metrics.stage('batch_summarize', rows=0, bytes=sum(ds.file_size for ds in pending.values())) as stage:
+        for ds in pending.values():
+            chunksize = settings.CSV_CHUNK_SIZE if ds.file.size > settings.CSV_STREAMING_THRESHOLD else None
+            futures[ds.id] = pool.submit(summarize_file, ds.file.path, ds.content_hash, chunksize, str(settings.MEDIA_ROOT),
+                                          anomalies, **options)
+        for ds_id, future in futures.items():
+            ds = pending[ds_id]
+            try:
+                summaries[ds_id] = future.result()
+            except Exception as exc:
+                logger.exception("Batch processing of dataset %s failed", ds_id)
+                failures[ds_id] = str(exc)
+                continue
+            stage.rows += summaries[ds_id]['total_count']
+    with transaction.atomic():
+        for ds_id, error in failures.items():
+            Dataset.objects.filter(pk=ds_id).update(status=Dataset.FAILED, error=error)
+            invalidate_dataset(ds_id)
+        for ds_id, summary in summaries.items():
+            ds = pending[ds_id]
+            ds.status, ds.error = Dataset.READY, ''
+            ds.set_summary(summary)
+        # Duplicates (of stored datasets or of files earlier in the batch) copy their original's summary.
+        for result in results:
+            if 'duplicate_of' in result:
+                dup = Dataset.objects.get(pk=result['id'])
+                try:
+                    original = Dataset.objects.get(pk=result['duplicate_of'])
+                except Dataset.DoesNotExist:
+                    dup.status, dup.error = Dataset.FAILED, ORIGINAL_DELETED
+                    dup.save(update_fields=['status', 'error'])
+                    invalidate_dataset(dup.pk)
+                    continue
+                dup.status, dup.error = original.status, original.error
+                dup.set_summary(original.get_summary())
+        apply_retention()
+
+
+def _run_batch_in_worker(results):
+    close_old_connections()
+    try:
+        process_batch(results)
+    finally:
+        close_old_connections()
+
+
+def submit_batch(results):
+    """Process a stored batch in the background, or inline when UPLOAD_ASYNC is off."""
+    if not settings.UPLOAD_ASYNC:
+        return process_batch(results)
+    get_executor().submit(_run_batch_in_worker, [dict(r) for r in results])
+    return results
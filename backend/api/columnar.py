@@ -0,0 +1,184 @@
+"""Typed columnar cache of parsed datasets.
+
+Each distinct dataset (keyed by content hash) is written once to
+``MEDIA_ROOT/columns/<hash>/`` as raw little-endian arrays plus a
+``manifest.json``: float64 for the numeric columns and int32 category codes
+for ``Type``. Readers memory-map only the columns they ask for, so loads are
+zero-copy and skip CSV parsing entirely.
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .schema import CsvSchema
+from .utils import NUMERIC_COLS
+
+NUMERIC_DTYPE = '<f8'
+CODES_DTYPE = '<i4'
+MANIFEST = 'manifest.json'
+
+
+def columns_root(media_root=None):
+    return Path(media_root or settings.MEDIA_ROOT) / 'columns'
+
+
+def column_dir(content_hash, media_root=None):
+    return columns_root(media_root) / content_hash
+
+
+def has_columns(content_hash, media_root=None):
+    return bool(content_hash) and (column_dir(content_hash, media_root) / MANIFEST).exists()
+
+
+def remove_columns(content_hash):
+    if content_hash:
+        shutil.rmtree(column_dir(content_hash), ignore_errors=True)
+
+
+class ColumnarWriter:
+    """Append DataFrame chunks to column files; ``close()`` publishes them atomically.
+
+    ``categories`` seeds the Type code table, so rows written for an append
+    use the same codes as the base cache they are concatenated onto.
+    ``media_root`` lets worker processes write without Django settings.
+    """
+
+    def __init__(self, content_hash, categories=(), media_root=None):
+        self.directory = column_dir(content_hash, media_root)
+        self.directory.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = Path(tempfile.mkdtemp(prefix=f'{content_hash}.', suffix='.tmp', dir=self.directory.parent))
+        self.rows = 0
+        self.categories = {c: i for i, c in enumerate(categories)}
+        self.handles = {}
+
+    def _handle(self, name):
+        if name not in self.handles:
+            self.handles[name] = open(self.tmp / f'{name}.bin', 'ab')
+        return self.handles[name]
+
+    def append(self, chunk):
+        for col in NUMERIC_COLS:
+            if col in chunk.columns:
+                chunk[col].to_numpy(dtype=NUMERIC_DTYPE, na_value=np.nan).tofile(self._handle(col))
+        if 'Type' in chunk.columns:
+            local, uniques = pd.factorize(chunk['Type'])
+            codes = np.full(len(chunk), -1, dtype=CODES_DTYPE)
+            if len(uniques):
+                mapping = np.array([self.categories.setdefault(str(u), len(self.categories)) for u in uniques], dtype=CODES_DTYPE)
+                valid = local >= 0
+                codes[valid] = mapping[local[valid]]
+            codes.tofile(self._handle('Type'))
+        self.rows += len(chunk)
+
+    def _write_manifest(self, directory, rows, columns):
+        manifest = {'rows': rows, 'columns': columns}
+        if 'Type' in columns:
+            manifest['categories'] = {'Type': list(self.categories)}
+        with open(directory / MANIFEST, 'w') as fh:
+            json.dump(manifest, fh)
+
+    def close(self):
+        for fh in self.handles.values():
+            fh.close()
+        columns = {col: NUMERIC_DTYPE for col in NUMERIC_COLS if col in self.handles}
+        if 'Type' in self.handles:
+            columns['Type'] = CODES_DTYPE
+        self._write_manifest(self.tmp, self.rows, columns)
+        self._publish(self.tmp)
+
+    def close_onto(self, base_hash, shared, content_hash=None):
+        """Publish base cache + the rows written here under this writer's hash.
+
+        The base directory is moved (or copied, when other datasets still use
+        it) and the new rows are appended to its column files, so the cost is
+        proportional to the appended rows. ``content_hash`` publishes under
+        that hash instead, for when it is only known after the rows were
+        written (e.g. the hash of the appended file).
+        """
+        for fh in self.handles.values():
+            fh.close()
+        base = column_dir(base_hash)
+        manifest = read_manifest(base_hash)
+        staging = self.tmp.with_name(self.tmp.name + '.base')
+        if shared:
+            shutil.copytree(base, staging)
+        else:
+            os.rename(base, staging)
+        # Results derived from the base rows (e.g. flagged anomalies) live in
+        # subdirectories and no longer apply once rows are appended.
+        for entry in staging.iterdir():
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+        for col in manifest['columns']:
+            if not (self.tmp / f'{col}.bin').exists():
+                continue
+            with open(staging / f'{col}.bin', 'ab') as out, open(self.tmp / f'{col}.bin', 'rb') as delta:
+                shutil.copyfileobj(delta, out)
+        self._write_manifest(staging, manifest['rows'] + self.rows, manifest['columns'])
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        if content_hash is not None:
+            self.directory = self.directory.parent / content_hash
+        self._publish(staging)
+
+    def _publish(self, directory):
+        try:
+            os.rename(directory, self.directory)
+        except OSError:
+            # Another job already published the same content.
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def abort(self):
+        for fh in self.handles.values():
+            fh.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def ensure_columns(ds):
+    """Return the dataset's content hash, building its columnar cache from the CSV if missing."""
+    content_hash = ds.ensure_content_hash()
+    if not has_columns(content_hash):
+        writer = ColumnarWriter(content_hash)
+        try:
+            schema = CsvSchema.sniff(ds.file.path)
+            kwargs = schema.read_kwargs(float32=settings.CSV_FLOAT32, chunked=True)
+            with pd.read_csv(ds.file.path, chunksize=settings.CSV_CHUNK_SIZE, **kwargs) as reader:
+                for chunk in reader:
+                    writer.append(schema.rename(chunk))
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+    return content_hash
+
+
+def read_manifest(content_hash, media_root=None):
+    with open(column_dir(content_hash, media_root) / MANIFEST) as fh:
+        return json.load(fh)
+
+
+def load_columns(content_hash, columns=None, media_root=None):
+    """Memory-map the requested columns of a cached dataset.
+
+    Numeric columns come back as read-only ``np.memmap`` views; ``Type`` as a
+    ``pd.Categorical`` built on its memory-mapped codes.
+    """
+    manifest = read_manifest(content_hash, media_root)
+    directory = column_dir(content_hash, media_root)
+    rows = manifest['rows']
+    wanted = manifest['columns'] if columns is None else columns
+    out = {}
+    for col in wanted:
+        dtype = manifest['columns'].get(col)
+        if dtype is None:
+            continue
+        data = np.memmap(directory / f'{col}.bin', dtype=dtype, mode='r', shape=(rows,)) if rows else np.empty(0, dtype=dtype)
+        if col == 'Type':
+            data = pd.Categorical.from_codes(data, categories=manifest['categories']['Type'], validate=False)
+        out[col] = data
+    return out
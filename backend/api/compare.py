@@ -0,0 +1,83 @@
+"""Cross-dataset comparison built from the stored aggregates.
+
+``compare_datasets()`` merges the per-column ColumnStat rows of many datasets
+with ``RunningStats`` (parallel Welford, so the merged mean and variance are
+exact) and adds up their TypeCount rows, in three queries and without reading
+any CSV. Datasets are reported in upload order together with the change in
+row count, column means and Type counts from each one to the next.
+"""
+from collections import defaultdict
+
+from .models import ColumnStat, TypeCount
+from .stats import RunningStats
+
+DATASET_FIELDS = ('id', 'original_filename', 'uploaded_at', 'total_count', 'summary_version')
+
+
+def _delta(before, after):
+    """``after - before`` per key; keys missing on one side count as 0 (None for means)."""
+    return {key: after.get(key, 0) - before.get(key, 0) for key in sorted(set(before) | set(after))}
+
+
+def _mean_delta(before, after):
+    return {col: after[col] - before[col] if after.get(col) is not None and before.get(col) is not None else None
+            for col in sorted(set(before) | set(after))}
+
+
+def compare_datasets(datasets):
+    """Merged statistics, combined Type distribution and consecutive deltas.
+
+    ``datasets`` is a queryset of ready datasets. Datasets whose stored
+    statistics predate counts/variances (summaries migrated from
+    ``summary_json``) cannot be weighted; they are listed under ``unmerged``
+    and left out of the merged statistics but not of the Type counts.
+    """
+    datasets = datasets.order_by('uploaded_at', 'id')
+    rows = list(datasets.values(*DATASET_FIELDS))
+    by_id = {row['id']: dict(row, averages={}, type_distribution={}) for row in rows}
+
+    merged = defaultdict(RunningStats)
+    unmerged = set()
+    stats = ColumnStat.objects.filter(dataset__in=datasets).values_list(
+        'dataset_id', 'column', 'count', 'mean', 'variance', 'min', 'max')
+    for dataset_id, column, count, mean, variance, lo, hi in stats:
+        by_id[dataset_id]['averages'][column] = mean
+        if count is None:
+            unmerged.add(dataset_id)
+            continue
+        merged[column].merge(RunningStats.from_dict({'count': count, 'mean': mean, 'variance': variance,
+                                                     'min': lo, 'max': hi}))
+
+    types = defaultdict(int)
+    for dataset_id, name, count in TypeCount.objects.filter(dataset__in=datasets).values_list(
+            'dataset_id', 'type', 'count'):
+        by_id[dataset_id]['type_distribution'][name] = count
+        types[name] += count
+
+    entries = [by_id[row['id']] for row in rows]
+    deltas = [{
+        'from': before['id'],
+        'to': after['id'],
+        'total_count': after['total_count'] - before['total_count'],
+        'averages': _mean_delta(before['averages'], after['averages']),
+        'type_distribution': _delta(before['type_distribution'], after['type_distribution']),
+    } for before, after in zip(entries, entries[1:])]
+
+    statistics = {}
+    for column, acc in sorted(merged.items()):
+        statistics[column] = dict(acc.as_dict(), std=acc.std)
+    return {
+        'count': len(entries),
+        'total_count': sum(entry['total_count'] for entry in entries),
+        'statistics': statistics,
+        'type_distribution': dict(sorted(types.items(), key=lambda kv: kv[1], reverse=True)),
+        'datasets': entries,
+        'deltas': deltas,
+        'unmerged': sorted(unmerged),
+    }
+
+
+def comparison_versions(datasets):
+    """``(id, summary_version)`` pairs the comparison of ``datasets`` depends on, for its ETag."""
+    return list(datasets.order_by('uploaded_at', 'id').values_list('id', 'summary_version'))
+
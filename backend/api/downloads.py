@@ -0,0 +1,152 @@
+"""Authenticated file downloads streamed straight from storage.
+
+Files are handed to the WSGI server as open file objects (``FileResponse``),
+so servers with a ``wsgi.file_wrapper`` can send them with sendfile instead
+of copying them through Python. A single ``Range`` is answered with 206, and
+CSVs are gzip-compressed on the fly for clients that accept it. The gzip body
+is a different representation, so it gets its own ETag (``gzip_etag``) and
+ranges are only ever served from the identity bytes.
+"""
+import os
+import re
+import zlib
+
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import content_disposition_header, parse_etags
+
+from .asyncapi import aiter_blocks
+
+GZIP_BLOCK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_NO_GZIP_RE = re.compile(r'^\s*q\s*=\s*0(\.0*)?\s*$')
+
+
+class UnsatisfiableRange(ValueError):
+    pass
+
+
+class RangeFile:
+    """Read-only view of the next ``length`` bytes of ``fileobj``.
+
+    ``fileno()`` is passed through so sendfile-capable servers can still send
+    the range (they read the offset from the file and the length from
+    Content-Length).
+    """
+
+    def __init__(self, fileobj, length):
+        self._file = fileobj
+        self._remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def parse_range(header, size):
+    """Inclusive ``(start, end)`` of a single byte range, or None to serve the whole file.
+
+    Multi-range and malformed headers are ignored (None); ranges starting past
+    the end raise UnsatisfiableRange.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end:
+            if last and int(last) < start:
+                return None
+            raise UnsatisfiableRange(header)
+    else:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise UnsatisfiableRange(header)
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+
+def accepts_gzip(request):
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() == 'gzip' and not _NO_GZIP_RE.match(params):
+            return True
+    return False
+
+
+def gzip_etag(etag):
+    """The ETag of the gzip-encoded representation of ``etag``'s bytes."""
+    return f'{etag[:-1]}-gzip"' if etag.endswith('"') else f'{etag}-gzip'
+
+
+def _gzip_stream(fileobj):
+    compressor = zlib.compressobj(wbits=31)
+    with fileobj:
+        for block in iter(lambda: fileobj.read(GZIP_BLOCK_SIZE), b''):
+            data = compressor.compress(block)
+            if data:
+                yield data
+    yield compressor.flush()
+
+
+def serve_file(request, path, content_type, filename, etag, as_attachment=False, gzip=False, asynchronous=False):
+    """Stream ``path`` honouring If-None-Match, Range/If-Range and (when ``gzip``) Accept-Encoding.
+
+    ``asynchronous`` makes the body an async iterator, for async views under ASGI.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        raise Http404("File not found")
+    range_header = request.META.get('HTTP_RANGE')
+    # A request with Range always gets identity bytes (a range or, when
+    # If-Range does not match, the whole file), so If-Range is only ever
+    # compared with the identity ETag.
+    use_gzip = gzip and not range_header and accepts_gzip(request)
+    selected = gzip_etag(etag) if use_gzip else etag
+    if selected in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponse(status=304)
+    else:
+        byte_range = None
+        if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+            try:
+                byte_range = parse_range(range_header, size)
+            except UnsatisfiableRange:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+        if byte_range:
+            start, end = byte_range
+            fileobj = open(path, 'rb')
+            fileobj.seek(start)
+            response = FileResponse(RangeFile(fileobj, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        elif use_gzip:
+            response = StreamingHttpResponse(_gzip_stream(open(path, 'rb')), content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = selected
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(response, private=True, no_cache=True)
+    if gzip:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if asynchronous and response.streaming:
+        # Headers (Content-Length etc.) are already set and the file stays
+        # registered for closing; only the iteration changes.
+        response.streaming_content = aiter_blocks(iter(response.streaming_content))
+    return response
@@ -0,0 +1,61 @@
+"""Point-budget downsampling of parameter series for charting."""
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: pick ``threshold`` visually significant points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    # Bucket i (1..threshold-2) covers [edges[i-1], edges[i]); first and last points are kept.
+    edges = (np.floor(np.arange(threshold - 1) * ((n - 2) / (threshold - 2))) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    # Average of every bucket up front; bucket i's "next" average is bucket i+1's
+    # (the final point for the last bucket).
+    avg_x = np.add.reduceat(x[:n - 1], starts) / sizes
+    avg_y = np.add.reduceat(y[:n - 1], starts) / sizes
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i, (start, end) in enumerate(zip(starts, edges[1:])):
+        area = np.abs((x[a] - avg_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y[i] - y[a]))
+        a = start + int(area.argmax())
+        picked[i + 1] = a
+    return x[picked], y[picked]
+
+
+def minmax(x, y, threshold):
+    """Keep the min and max of each of ``threshold // 2`` equal buckets, in x order."""
+    n = len(x)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return x, y
+    size = -(-n // buckets)
+    # Only the last bucket may be partly padding; never a whole one.
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lo = offsets + np.nanargmin(grid, axis=1)
+    hi = offsets + np.nanargmax(grid, axis=1)
+    picked = np.unique(np.concatenate([lo, hi]))
+    return x[picked], y[picked]
+
+
+def downsample(values, points, start=0, end=None, method='lttb'):
+    """Downsample ``values[start:end]`` to at most ``points`` points; x is the row index."""
+    y = np.asarray(values[start:end], dtype='float64')
+    x = np.arange(start, start + len(y), dtype='float64')
+    keep = ~np.isnan(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    reducer = lttb if method == 'lttb' else minmax
+    return reducer(x, y, points)
@@ -0,0 +1,104 @@
+"""Conditional GET support for the dataset endpoints.
+
+Responses carry a strong ETag derived from the dataset id and summary version
+(plus status and report for the dataset metadata) and ``Cache-Control:
+private, no-cache``, so pollers revalidate and get ``304 Not Modified`` while
+nothing changed. With RESPONSE_CACHE_SIZE set, serialized payloads are also
+kept in an in-process LRU cache that is invalidated whenever a dataset is
+saved, deleted or has its status/report updated, so repeat polls are answered
+without touching the database. Invalidation is per process, so the cache is
+off by default.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def summary_etag(ds):
+    return make_etag('summary', ds.pk, ds.summary_version)
+
+
+def dataset_etag(ds, base):
+    return make_etag('dataset', base, ds.pk, ds.summary_version, ds.status, ds.pdf_report.name or '')
+
+
+def datasets_etag(query, datasets):
+    return make_etag('datasets', query, *(f"{ds.pk}-{ds.summary_version}-{ds.status}-{ds.pdf_report.name or ''}"
+                                          for ds in datasets))
+
+
+class ResponseCache:
+    """LRU of ``key -> (etag, data)``; keys are ``(kind, pk_or_query)`` tuples."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.incr('response_cache_hits' if entry is not None else 'response_cache_misses')
+        return entry
+
+    def set(self, key, entry, generation):
+        """Store ``entry`` unless an invalidation happened since ``generation`` was read."""
+        size = settings.RESPONSE_CACHE_SIZE
+        with self._lock:
+            if not size or generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, pk=None):
+        """Drop entries for dataset ``pk`` (all entries when None) and every list page."""
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries if pk is None or k[0] == 'datasets' or k[1] == pk]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_dataset(pk):
+    """Invalidate cached responses for a dataset once the current transaction commits."""
+    transaction.on_commit(lambda: response_cache.invalidate(pk))
+
+
+def not_modified(request, etag):
+    """Whether the client's If-None-Match already has ``etag``."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    return bool(if_none_match) and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*')
+
+
+def cached_response(request, etag, data):
+    """200 with ``data`` or 304 when the client's If-None-Match already has ``etag``."""
+    if not_modified(request, etag):
+        metrics.incr('not_modified')
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,192 @@
+"""Append new rows to an existing dataset and merge them into its stored aggregates."""
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from . import metrics
+from .columnar import ColumnarWriter, has_columns, read_manifest
+from .httpcache import invalidate_dataset
+from .jobs import get_executor
+from .models import Dataset
+from .schema import configured_options
+from .stats import RunningStats
+from .utils import file_sha256, parse_csv_and_summary
+
+
+logger = logging.getLogger(__name__)
+
+
+class AppendError(ValueError):
+    pass
+
+
+def merge_summaries(base, delta):
+    """Merge two summary dicts: counts add, moments combine by parallel Welford."""
+    statistics = {}
+    for col in set(base.get('statistics', {})) | set(delta.get('statistics', {})):
+        acc = RunningStats.from_dict(base['statistics'].get(col, {}))
+        acc.merge(RunningStats.from_dict(delta['statistics'].get(col, {})))
+        statistics[col] = acc.as_dict()
+    type_dist = dict(base.get('type_distribution', {}))
+    for t, cnt in delta.get('type_distribution', {}).items():
+        type_dist[str(t)] = type_dist.get(str(t), 0) + cnt
+    return {
+        'total_count': base['total_count'] + delta['total_count'],
+        'averages': {col: s['mean'] for col, s in statistics.items()},
+        'type_distribution': dict(sorted(type_dist.items(), key=lambda kv: kv[1], reverse=True)),
+        'columns': base['columns'],
+        'statistics': statistics,
+    }
+
+
+def _mergeable(summary):
+    # Summaries migrated from summary_json only carry means, not counts/variances.
+    return all(s.get('count') is not None for s in summary['statistics'].values())
+
+
+def _shared(field, value, ds):
+    return Dataset.objects.filter(**{field: value}).exclude(pk=ds.pk).exists()
+
+
+def _append_raw(ds, uploaded):
+    """Append the delta's data lines (header dropped) to the dataset's CSV.
+
+    Returns a callable that undoes the change: the file is truncated back to
+    its old size, or the copy-on-write copy is deleted.
+    """
+    if _shared('file', ds.file.name, ds):
+        # Copy-on-write: the stored file is also used by deduplicated datasets.
+        original = ds.file.name
+        with open(ds.file.path, 'rb') as src:
+            ds.file.name = default_storage.save(ds.file.name, File(src))
+        copy = ds.file.name
+
+        def undo():
+            default_storage.delete(copy)
+            ds.file.name = original
+    else:
+        size = os.path.getsize(ds.file.path)
+
+        def undo():
+            os.truncate(ds.file.path, size)
+    try:
+        with open(ds.file.path, 'rb+') as out:
+            out.seek(0, os.SEEK_END)
+            if out.tell():
+                out.seek(-1, os.SEEK_END)
+                if out.read(1) != b'\n':
+                    out.write(b'\n')
+            in_header = True
+            for chunk in uploaded.chunks():
+                if in_header:
+                    newline = chunk.find(b'\n')
+                    if newline < 0:
+                        continue
+                    chunk, in_header = chunk[newline + 1:], False
+                out.write(chunk)
+    except BaseException:
+        undo()
+        raise
+    return undo
+
+
+def append_rows(ds, uploaded):
+    """Merge the CSV rows in ``uploaded`` into dataset ``ds``; cost scales with the delta.
+
+    Raises AppendError when the delta's columns do not match the dataset.
+    Appends to one dataset are serialized across processes by locking its
+    row (``select_for_update``; on SQLite the IMMEDIATE transaction takes the
+    database write lock instead), so only delta-sized work happens under the
+    lock: the rows are appended to the CSV in place and undone if anything
+    fails before the commit. SHA-256 cannot be resumed from a stored hash,
+    so the merged file's ``content_hash`` (and the columnar cache keyed by
+    it) is filled in after the commit by ``finish_append()``, on the upload
+    workers when UPLOAD_ASYNC is on; until then it is empty and computed on
+    demand like for legacy datasets.
+    """
+    with transaction.atomic():
+        ds = Dataset.objects.select_for_update().get(pk=ds.pk)
+        base = ds.get_summary()
+        old_hash = ds.content_hash
+
+        writer = None
+        if old_hash and has_columns(old_hash):
+            categories = read_manifest(old_hash).get('categories', {}).get('Type', [])
+            # Published under the merged file's hash once it is known.
+            writer = ColumnarWriter(f'append-{uuid.uuid4().hex}', categories=categories)
+        undo = None
+        try:
+            uploaded.seek(0)
+            chunksize = settings.CSV_CHUNK_SIZE if uploaded.size > settings.CSV_STREAMING_THRESHOLD else None
+            with metrics.stage('append_parse', bytes=uploaded.size) as stage:
+                delta, _ = parse_csv_and_summary(uploaded, chunksize=chunksize, sink=writer, **configured_options())
+                stage.rows = delta['total_count']
+            if delta['columns'] != base['columns']:
+                raise AppendError(f"Columns {delta['columns']} do not match dataset columns {base['columns']}")
+            uploaded.seek(0)
+            undo = _append_raw(ds, uploaded)
+            if _mergeable(base):
+                summary = merge_summaries(base, delta)
+            else:
+                summary, _ = parse_csv_and_summary(ds.file.path, chunksize=settings.CSV_CHUNK_SIZE,
+                                                   **configured_options())
+            ds.content_hash = ''
+            ds.summary_version += 1
+            ds.file_size = ds.file.size
+            ds.pdf_report = None
+            ds.set_summary(summary)
+        except BaseException:
+            if undo:
+                undo()
+            if writer:
+                writer.abort()
+            raise
+    transaction.on_commit(lambda: _submit_finish(ds.pk, ds.summary_version, old_hash, writer))
+    return ds
+
+
+def _submit_finish(dataset_id, version, old_hash, writer):
+    if not settings.UPLOAD_ASYNC:
+        finish_append(dataset_id, version, old_hash, writer)
+        return
+    get_executor().submit(_finish_in_worker, dataset_id, version, old_hash, writer)
+
+
+def _finish_in_worker(*args):
+    close_old_connections()
+    try:
+        finish_append(*args)
+    except Exception:
+        logger.exception("Finishing append to dataset %s failed", args[0])
+    finally:
+        close_old_connections()
+
+
+def finish_append(dataset_id, version, old_hash, writer=None):
+    """Hash the appended file and publish its columnar cache, outside the write lock.
+
+    Skipped when another append has changed the dataset since (it finishes
+    its own). Without a writer the columns are rebuilt on demand.
+    """
+    try:
+        ds = Dataset.objects.get(pk=dataset_id, summary_version=version)
+    except Dataset.DoesNotExist:
+        if writer:
+            writer.abort()
+        return
+    try:
+        with metrics.stage('hash', bytes=ds.file.size):
+            new_hash = file_sha256(ds.file)
+        if writer:
+            writer.close_onto(old_hash, shared=_shared('content_hash', old_hash, ds), content_hash=new_hash)
+    except Exception:
+        if writer:
+            writer.abort()
+        raise
+    if Dataset.objects.filter(pk=dataset_id, summary_version=version, content_hash='').update(content_hash=new_hash):
+        invalidate_dataset(dataset_id)
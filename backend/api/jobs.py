@@ -0,0 +1,81 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import metrics
+from .anomalies import ensure_anomalies
+from .httpcache import invalidate_dataset
+from .models import Dataset
+from .pipeline import summarize_file
+from .retention import apply_retention
+from .schema import configured_options
+from .utils import file_sha256
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_WORKERS, thread_name_prefix='upload')
+        return _executor
+
+
+def submit_dataset(dataset_id):
+    """Queue a dataset for processing, or run it inline when UPLOAD_ASYNC is off."""
+    if not settings.UPLOAD_ASYNC:
+        process_dataset(dataset_id)
+        return None
+    return get_executor().submit(_run_in_worker, dataset_id)
+
+
+def _run_in_worker(dataset_id):
+    # Worker threads hold their own DB connections; drop them between jobs.
+    close_old_connections()
+    try:
+        process_dataset(dataset_id)
+    finally:
+        close_old_connections()
+
+
+def process_dataset(dataset_id):
+    """parse -> summarize (+ columnar cache) -> detect anomalies -> retention for one uploaded dataset.
+
+    The summary and the retention deletes are written in one transaction.
+    The PDF report is rendered lazily on first download (see api.reports).
+    """
+    try:
+        ds = Dataset.objects.get(pk=dataset_id)
+    except Dataset.DoesNotExist:
+        return
+    Dataset.objects.filter(pk=ds.pk).update(status=Dataset.PROCESSING)
+    invalidate_dataset(ds.pk)
+    try:
+        size = ds.file.size
+        chunksize = settings.CSV_CHUNK_SIZE if size > settings.CSV_STREAMING_THRESHOLD else None
+        if not ds.content_hash:
+            with metrics.stage('hash', bytes=size):
+                ds.content_hash = file_sha256(ds.file)
+        with metrics.stage('summarize', bytes=size) as stage:
+            summary = summarize_file(ds.file.path, ds.content_hash, chunksize=chunksize, **configured_options())
+            stage.rows = summary['total_count']
+        if settings.ANOMALY_DETECTION:
+            with metrics.stage('detect', rows=summary['total_count']):
+                ensure_anomalies(ds.content_hash)
+        ds.status = Dataset.READY
+        ds.error = ''
+        with transaction.atomic():
+            with metrics.stage('store_summary'):
+                ds.set_summary(summary)
+            apply_retention()
+    except Exception as exc:
+        logger.exception("Processing dataset %s failed", dataset_id)
+        Dataset.objects.filter(pk=dataset_id).update(status=Dataset.FAILED, error=str(exc))
+        invalidate_dataset(dataset_id)
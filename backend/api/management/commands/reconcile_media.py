@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.retention import ORPHAN_GRACE_SECONDS, apply_retention, fail_stale_jobs, reconcile_media
+
+
+class Command(BaseCommand):
+    help = "Fail stale upload jobs, apply dataset retention and remove media files no dataset references."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=ORPHAN_GRACE_SECONDS,
+                            help="Only remove orphans older than this many seconds.")
+        parser.add_argument('--dry-run', action='store_true', help="List orphans without deleting anything.")
+
+    def handle(self, *args, grace, dry_run, **options):
+        if not dry_run:
+            self.stdout.write(f"Marked {fail_stale_jobs()} stale upload jobs as failed")
+            deleted = apply_retention()
+            self.stdout.write(f"Retention deleted {deleted} datasets")
+        names, dirs = reconcile_media(grace=grace, dry_run=dry_run)
+        for orphan in [*names, *map(str, dirs)]:
+            self.stdout.write(orphan)
+        verb = "Found" if dry_run else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(names)} orphaned files and {len(dirs)} orphaned column dirs"))
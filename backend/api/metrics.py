@@ -0,0 +1,152 @@
+"""In-process counters and latency histograms, exported as JSON or Prometheus text.
+
+Metrics take optional labels (``incr('http_requests', view='upload')``).
+``stage()`` times one step of a request or job and also records the bytes
+and rows it processed and the DB queries it ran.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = 'equipment_'
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def incr(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        timing = _timings.get(key)
+        if timing is None:
+            timing = _timings[key] = [0, 0.0, [0] * len(BUCKETS)]
+        timing[0] += 1
+        timing[1] += seconds
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            timing[2][index] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+@contextmanager
+def count_queries():
+    """Count the DB queries run on this thread's connection; yields a one-item list."""
+    counter = [0]
+
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+class Stage:
+    """Set ``rows`` / ``bytes`` on the object yielded by ``stage()`` once they are known."""
+    __slots__ = ('name', 'rows', 'bytes')
+
+    def __init__(self, name, rows=None, bytes=None):
+        self.name, self.rows, self.bytes = name, rows, bytes
+
+
+@contextmanager
+def stage(name, rows=None, bytes=None):
+    current = Stage(name, rows, bytes)
+    start = time.perf_counter()
+    with count_queries() as queries:
+        try:
+            yield current
+        finally:
+            observe('stage_seconds', time.perf_counter() - start, stage=name)
+            incr('stage_db_queries', queries[0], stage=name)
+            if current.rows is not None:
+                incr('stage_rows', current.rows, stage=name)
+            if current.bytes is not None:
+                incr('stage_bytes', current.bytes, stage=name)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _flat_name(name, labels):
+    return name + _label_text(labels)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': {_flat_name(n, l): v for (n, l), v in _counters.items()},
+            'timings': {_flat_name(n, l): {'count': c, 'total_seconds': t} for (n, l), (c, t, _) in _timings.items()},
+        }
+
+
+def prometheus_text():
+    """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = sorted(_counters.items())
+        timings = sorted((key, (c, t, list(b))) for key, (c, t, b) in _timings.items())
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        metric = f'{PREFIX}{name}_total'
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric}{_label_text(labels)} {value}')
+    for (name, labels), (count, total, buckets) in timings:
+        metric = f'{PREFIX}{name}'
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# TYPE {metric} histogram')
+        cumulative = 0
+        for bound, hits in zip(BUCKETS, buckets):
+            cumulative += hits
+            lines.append(f'{metric}_bucket{_label_text(labels + (("le", repr(bound)),))} {cumulative}')
+        lines.append(f'{metric}_bucket{_label_text(labels + (("le", "+Inf"),))} {count}')
+        lines.append(f'{metric}_sum{_label_text(labels)} {total!r}')
+        lines.append(f'{metric}_count{_label_text(labels)} {count}')
+    # Throughput per stage, derived from the stage counters and timings above.
+    stage_seconds = {labels: total for (name, labels), (_, total, _) in timings if name == 'stage_seconds'}
+    rates = [(labels, value / stage_seconds[labels]) for (name, labels), value in counters
+             if name == 'stage_rows' and stage_seconds.get(labels)]
+    if rates:
+        lines.append(f'# TYPE {PREFIX}stage_rows_per_second gauge')
+        lines.extend(f'{PREFIX}stage_rows_per_second{_label_text(labels)} {rate!r}' for labels, rate in rates)
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
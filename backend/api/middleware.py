@@ -0,0 +1,125 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # optional
+    InstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+
+
+class RequestMetricsMiddleware:
+    """Record latency, status and DB query counts per view; profile on request.
+
+    With REQUEST_PROFILING on, a request carrying ``X-Profile: cprofile`` (or
+    ``pyinstrument`` when it is installed) and ``X-Profile-Token:
+    <REQUEST_PROFILE_TOKEN>`` is profiled with probability
+    REQUEST_PROFILE_SAMPLE_RATE and the dump is written to PROFILE_DIR; its
+    file name is returned in the ``X-Profile-Dump`` header. This middleware
+    runs before authentication, so the shared token is what keeps other
+    clients from triggering profiles.
+
+    Under ASGI with async views the middleware runs on the event loop, where
+    a profiler would also sample unrelated requests and the ORM runs on
+    another thread's connection, so only latency and status are recorded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = self._profiler(request)
+        start = time.perf_counter()
+        with metrics.count_queries() as queries:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                self._start(profiler)
+                try:
+                    response = self.get_response(request)
+                finally:
+                    self._stop(profiler)
+        elapsed = time.perf_counter() - start
+        view = self._record(request, response, elapsed)
+        metrics.incr('http_db_queries', queries[0], view=view)
+        if profiler is not None:
+            response['X-Profile-Dump'] = self._dump(profiler, view)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _record(request, response, elapsed):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        metrics.observe('http_request_seconds', elapsed, view=view)
+        metrics.incr('http_requests', view=view, method=request.method, status=response.status_code)
+        return view
+
+    def _profiler(self, request):
+        kind = request.META.get(PROFILE_HEADER, '').strip().lower()
+        if not kind or not settings.REQUEST_PROFILING or not self._has_token(request):
+            return None
+        if random.random() >= settings.REQUEST_PROFILE_SAMPLE_RATE:
+            return None
+        if kind == 'pyinstrument' and InstrumentProfiler is not None:
+            return InstrumentProfiler()
+        return cProfile.Profile()
+
+    @staticmethod
+    def _has_token(request):
+        token = settings.REQUEST_PROFILE_TOKEN
+        sent = request.META.get(PROFILE_TOKEN_HEADER, '')
+        return bool(token) and hmac.compare_digest(sent.encode(), token.encode())
+
+    @staticmethod
+    def _start(profiler):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.enable()
+        else:
+            profiler.start()
+
+    @staticmethod
+    def _stop(profiler):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+
+    @staticmethod
+    def _dump(profiler, view):
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{view}-{os.getpid()}-{random.randrange(1 << 16):04x}"
+        if isinstance(profiler, cProfile.Profile):
+            name = f'{stem}.prof'
+            profiler.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+        else:
+            name = f'{stem}.html'
+            with open(os.path.join(settings.PROFILE_DIR, name), 'w') as fh:
+                fh.write(profiler.output_html())
+        logger.info("Wrote request profile %s", name)
+        return name
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_dataset_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
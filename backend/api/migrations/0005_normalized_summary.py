@@ -0,0 +1,87 @@
+# Generated by Django 4.2 on 2026-10-18 06:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import json
+
+
+def copy_summary_json(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    ColumnStat = apps.get_model('api', 'ColumnStat')
+    TypeCount = apps.get_model('api', 'TypeCount')
+    for ds in Dataset.objects.exclude(summary_json=''):
+        summary = json.loads(ds.summary_json)
+        ds.total_count = summary.get('total_count', 0)
+        ds.columns = summary.get('columns', [])
+        ds.save(update_fields=['total_count', 'columns'])
+        ColumnStat.objects.bulk_create([
+            ColumnStat(dataset=ds, column=col, mean=avg)
+            for col, avg in summary.get('averages', {}).items() if avg is not None
+        ])
+        TypeCount.objects.bulk_create([
+            TypeCount(dataset=ds, type=str(t), count=cnt)
+            for t, cnt in summary.get('type_distribution', {}).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_dataset_content_hash_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='columns',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='total_count',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TypeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_counts', to='api.dataset')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ColumnStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('column', models.CharField(max_length=64)),
+                ('count', models.BigIntegerField(null=True)),
+                ('mean', models.FloatField(null=True)),
+                ('variance', models.FloatField(null=True)),
+                ('min', models.FloatField(null=True)),
+                ('max', models.FloatField(null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='column_stats', to='api.dataset')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='typecount',
+            index=models.Index(fields=['type', 'count'], name='api_typecou_type_0bb761_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='typecount',
+            constraint=models.UniqueConstraint(fields=('dataset', 'type'), name='unique_dataset_type'),
+        ),
+        migrations.AddIndex(
+            model_name='columnstat',
+            index=models.Index(fields=['column', 'mean'], name='api_columns_column_d866b6_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='columnstat',
+            constraint=models.UniqueConstraint(fields=('dataset', 'column'), name='unique_dataset_column'),
+        ),
+        migrations.RunPython(copy_summary_json, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='dataset',
+            name='summary_json',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_normalized_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='summary_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 06:17
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def fill_file_size(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    for ds in Dataset.objects.exclude(file=''):
+        try:
+            size = default_storage.size(ds.file.name)
+        except OSError:
+            continue
+        Dataset.objects.filter(pk=ds.pk).update(file_size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_dataset_summary_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='file_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_file_size, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,88 @@
 
 # Create your models here.
-from django.db import models
-import json
+from django.db import models, transaction
+from .utils import NUMERIC_COLS, file_sha256
 
 class Dataset(models.Model):
-    uploaded_at = models.DateTimeField(auto_now_add=True)
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+
+    uploaded_at = models.DateTimeField(auto_now_add=True, db_index=True)
     file = models.FileField(upload_to='datasets/')
+    file_size = models.BigIntegerField(default=0)
     original_filename = models.CharField(max_length=255)
-    summary_json = models.TextField(blank=True)
+    total_count = models.BigIntegerField(default=0)
+    columns = models.JSONField(default=list, blank=True)
     pdf_report = models.FileField(upload_to='reports/', null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=READY)
+    error = models.TextField(blank=True)
+    summary_version = models.PositiveIntegerField(default=1)
 
     def set_summary(self, summary_dict):
-        self.summary_json = json.dumps(summary_dict)
-        self.save()
+        """Store a parse_csv_and_summary() dict in the normalized summary tables."""
+        stats = summary_dict.get('statistics', {})
+        with transaction.atomic():
+            self.total_count = summary_dict.get('total_count', 0)
+            self.columns = summary_dict.get('columns', [])
+            self.save()
+            self.column_stats.all().delete()
+            self.type_counts.all().delete()
+            ColumnStat.objects.bulk_create([
+                ColumnStat(dataset=self, column=col, **stats.get(col, {'mean': avg}))
+                for col, avg in summary_dict.get('averages', {}).items() if avg is not None
+            ])
+            TypeCount.objects.bulk_create([
+                TypeCount(dataset=self, type=str(t), count=cnt)
+                for t, cnt in summary_dict.get('type_distribution', {}).items()
+            ])
+
+    def ensure_content_hash(self):
+        """Fill in content_hash for datasets uploaded before hashing existed."""
+        if not self.content_hash:
+            self.content_hash = file_sha256(self.file)
+            Dataset.objects.filter(pk=self.pk).update(content_hash=self.content_hash)
+        return self.content_hash
 
     def get_summary(self):
-        import json
-        return json.loads(self.summary_json) if self.summary_json else {}
+        stats = {row.pop('column'): row for row in self.column_stats.values('column', 'count', 'mean', 'variance', 'min', 'max')}
+        return {
+            'total_count': self.total_count,
+            'averages': {col: stats[col]['mean'] if col in stats else None for col in NUMERIC_COLS},
+            'type_distribution': dict(self.type_counts.order_by('-count', 'id').values_list('type', 'count')),
+            'columns': self.columns,
+            'statistics': stats,
+        }
+
+
+class ColumnStat(models.Model):
+    """Per-column aggregates of a dataset; mergeable across datasets via count/mean/variance."""
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='column_stats')
+    column = models.CharField(max_length=64)
+    count = models.BigIntegerField(null=True)
+    mean = models.FloatField(null=True)
+    variance = models.FloatField(null=True)
+    min = models.FloatField(null=True)
+    max = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['dataset', 'column'], name='unique_dataset_column')]
+        indexes = [models.Index(fields=['column', 'mean'])]
+
+
+class TypeCount(models.Model):
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='type_counts')
+    type = models.CharField(max_length=255)
+    count = models.BigIntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['dataset', 'type'], name='unique_dataset_type')]
+        indexes = [models.Index(fields=['type', 'count'])]
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DatasetCursorPagination(CursorPagination):
+    """Keyset pagination over the ``uploaded_at`` index, newest first."""
+    ordering = ('-uploaded_at', '-id')
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,26 @@
+"""Database-free parse/summarize stage, shared by the upload thread pool and
+the batch process pool (it must stay importable without Django set up)."""
+from .anomalies import ensure_anomalies
+from .columnar import ColumnarWriter, has_columns
+from .utils import parse_csv_and_summary
+
+
+def summarize_file(path, content_hash, chunksize=None, media_root=None, anomalies=None, **options):
+    """Summarize a stored CSV and write its columnar cache if not already present.
+
+    ``options`` (``engine``, ``float32``) are passed to ``parse_csv_and_summary``.
+    With an ``anomalies`` config (``anomalies.detection_config()``) the
+    flagged rows are detected and stored from the columnar cache as well.
+    """
+    writer = None if has_columns(content_hash, media_root) else ColumnarWriter(content_hash, media_root=media_root)
+    try:
+        summary, _ = parse_csv_and_summary(path, chunksize=chunksize, sink=writer, **options)
+    except Exception:
+        if writer:
+            writer.abort()
+        raise
+    if writer:
+        writer.close()
+    if anomalies is not None:
+        ensure_anomalies(content_hash, anomalies, media_root)
+    return summary
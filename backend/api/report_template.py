@@ -0,0 +1,205 @@
+"""Reusable ReportLab layout for equipment reports.
+
+Paragraph and table styles are built once per process (``get_template()``)
+instead of on every render, table cells are filled from NumPy arrays, and
+tables use fixed row heights so long per-type breakdowns split across pages
+(with a repeated header) without ReportLab measuring every cell.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+from django.core.files.base import ContentFile
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+SAMPLE_COLUMNS = 6
+CELL_CHARS = 30
+# Cell text never wraps, so row heights are fixed up front instead of measured per render.
+HEADER_ROW_HEIGHT = 27
+ROW_HEIGHT = 18
+RULE_NAMES = {'zscore': 'Z-score', 'iqr': 'IQR', 'threshold': 'Type threshold'}
+
+_a85_guard = threading.Lock()
+_a85_renders = 0
+_a85_saved = None
+
+
+def _row_heights(data):
+    return [HEADER_ROW_HEIGHT] + [ROW_HEIGHT] * (len(data) - 1)
+
+
+def _table_style(header_color, align, header_size, grid_color=colors.black, body_size=None):
+    commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), align),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+    ]
+    if body_size:
+        commands.append(('FONTSIZE', (0, 1), (-1, -1), body_size))
+    commands += [
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, grid_color),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f0f0f0')]),
+    ]
+    return TableStyle(commands)
+
+
+@contextmanager
+def _without_a85():
+    """Turn off ReportLab's ASCII85 pass while reports build, restoring the old value after.
+
+    ReportLab only reads ``rl_config.useA85`` (no per-document option), so
+    overlapping renders share one override: the first saves the old value and
+    the last puts it back.
+    """
+    global _a85_renders, _a85_saved
+    with _a85_guard:
+        if not _a85_renders:
+            _a85_saved = rl_config.useA85
+            rl_config.useA85 = 0
+        _a85_renders += 1
+    try:
+        yield
+    finally:
+        with _a85_guard:
+            _a85_renders -= 1
+            if not _a85_renders:
+                rl_config.useA85 = _a85_saved
+
+
+class ReportTemplate:
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal = styles['Normal']
+        self.title = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1f4788'),
+            spaceAfter=6,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        )
+        self.heading = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#2d5aa8'),
+            spaceAfter=12,
+            spaceBefore=12,
+            fontName='Helvetica-Bold'
+        )
+        self.summary_style = _table_style('#2d5aa8', 'LEFT', 12)
+        self.type_style = _table_style('#1f4788', 'CENTER', 11)
+        self.sample_style = _table_style('#2d5aa8', 'LEFT', 10, grid_color=colors.grey, body_size=8)
+
+    def render(self, summary, df, title="Equipment Report", anomalies=None):
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        story = [
+            Paragraph(title, self.title),
+            Paragraph(f"<font size=10 color='#666666'>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</font>", self.normal),
+            Spacer(1, 0.3*inch),
+        ]
+        story += self.summary_section(summary)
+        story += self.type_section(summary.get('type_distribution') or {})
+        if anomalies is not None:
+            story += self.anomaly_section(anomalies)
+        story += self.sample_section(df)
+        # Page streams are Flate-compressed anyway; the extra ASCII85 pass only
+        # inflates the file and costs a pure-Python encode per page.
+        with _without_a85():
+            doc.build(story, onLaterPages=self._page_number)
+        return ContentFile(buffer.getvalue(), name="report.pdf")
+
+    @staticmethod
+    def _page_number(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawRightString(letter[0] - 0.5*inch, 0.3*inch, f"Page {doc.page}")
+        canvas.restoreState()
+
+    def summary_section(self, summary):
+        data = [
+            ['Metric', 'Value'],
+            ['Total Equipment Records', str(summary.get('total_count', 0))],
+        ]
+        for k, v in summary.get('averages', {}).items():
+            data.append([f'Average {k}', f"{v:.3f}" if v is not None else "N/A"])
+        table = Table(data, colWidths=[3*inch, 2.5*inch], rowHeights=_row_heights(data))
+        table.setStyle(self.summary_style)
+        return [Paragraph("📊 Summary Statistics", self.heading), table, Spacer(1, 0.3*inch)]
+
+    def type_section(self, type_distribution):
+        if not type_distribution:
+            return []
+        names = sorted(type_distribution)
+        counts = np.array([type_distribution[t] for t in names], dtype='int64')
+        total = counts.sum()
+        percentages = counts * (100.0 / total) if total > 0 else np.zeros(len(counts))
+        rows = [[str(t), str(c), f'{p:.1f}%'] for t, c, p in zip(names, counts.tolist(), percentages.tolist())]
+        data = [['Type', 'Count', 'Percentage']] + rows
+        # Fixed row heights make splitting across pages cheap; the header repeats on every page.
+        table = Table(data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch], rowHeights=_row_heights(data), repeatRows=1)
+        table.setStyle(self.type_style)
+        section = [Paragraph("🏷️  Equipment Type Distribution", self.heading), table]
+        section.append(Spacer(1, 0.3*inch))
+        return section
+
+    def anomaly_section(self, anomalies, top_types=10):
+        """Flagged-row counts per rule and column (an ``anomalies.detect()`` manifest)."""
+        rows = anomalies.get('rows', 0)
+        flagged = anomalies.get('flagged', 0)
+        share = f" ({flagged * 100.0 / rows:.2f}% of {rows})" if rows else ""
+        section = [Paragraph("⚠️ Anomalies", self.heading),
+                   Paragraph(f"Rows flagged by at least one rule: {flagged}{share}", self.normal),
+                   Spacer(1, 0.15*inch)]
+        data = [['Rule', 'Parameter', 'Allowed range', 'Flagged rows']]
+        for rule, columns in anomalies.get('rules', {}).items():
+            for col, result in columns.items():
+                bounds = f"{result['low']:.3f} to {result['high']:.3f}" if 'low' in result else "per Type"
+                data.append([RULE_NAMES.get(rule, rule), col, bounds, str(result['count'])])
+        if len(data) > 1:
+            table = Table(data, colWidths=[1.7*inch, 1.3*inch, 2.0*inch, 1.2*inch], rowHeights=_row_heights(data),
+                          repeatRows=1)
+            table.setStyle(self.summary_style)
+            section += [table, Spacer(1, 0.2*inch)]
+        by_type = list(anomalies.get('by_type', {}).items())[:top_types]
+        if by_type:
+            data = [['Type', 'Flagged rows']] + [[t or '(none)', str(n)] for t, n in by_type]
+            table = Table(data, colWidths=[2.5*inch, 1.5*inch], rowHeights=_row_heights(data), repeatRows=1)
+            table.setStyle(self.type_style)
+            section.append(table)
+        section.append(Spacer(1, 0.3*inch))
+        return section
+
+    def sample_section(self, df, rows=10):
+        display_cols = list(df.columns)[:SAMPLE_COLUMNS]
+        section = [Paragraph(f"📋 Sample Data (First {rows} Records)", self.heading)]
+        if not display_cols:
+            return section
+        values = df[display_cols].head(rows).astype(str).to_numpy()
+        data = [[str(c) for c in display_cols]] + [[v[:CELL_CHARS].replace('\n', ' ') for v in row] for row in values.tolist()]
+        col_widths = [letter[0] / len(display_cols) - 0.1*inch for _ in display_cols]
+        table = Table(data, colWidths=col_widths, rowHeights=_row_heights(data), repeatRows=1)
+        table.setStyle(self.sample_style)
+        section.append(table)
+        return section
+
+
+@lru_cache(maxsize=None)
+def get_template():
+    return ReportTemplate()
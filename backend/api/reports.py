@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+
+from . import metrics
+from .anomalies import config_digest, detection_config, ensure_anomalies
+from .columnar import ensure_columns
+from .httpcache import invalidate_dataset
+from .utils import SAMPLE_ROWS, generate_pdf_report
+
+# Bump when the report layout changes so cached PDFs are re-rendered.
+REPORT_VERSION = 4
+REPORT_TITLE = "Equipment Report"
+# Renders of the same report are serialized by a fixed set of striped locks,
+# so the lock table does not grow with the number of reports.
+RENDER_LOCK_STRIPES = 64
+
+_render_locks = [threading.Lock() for _ in range(RENDER_LOCK_STRIPES)]
+
+
+def report_options():
+    """Layout options the cached PDF depends on.
+
+    Per-upload metadata (such as the original filename) stays out of the PDF
+    and its cache key, so identical re-uploads share one rendered report.
+    """
+    return {'title': REPORT_TITLE, 'version': REPORT_VERSION, 'anomalies': config_digest(detection_config())}
+
+
+def report_cache_name(content_hash, options):
+    """Storage name of a rendered report: content hash + report options."""
+    key = hashlib.sha256(f"{content_hash}:{json.dumps(options, sort_keys=True)}".encode()).hexdigest()
+    return f"reports/{key[:40]}.pdf"
+
+
+def _lock_for(name):
+    return _render_locks[hash(name) % RENDER_LOCK_STRIPES]
+
+
+def _publish(name, pdf_file):
+    """Write the PDF beside its final path and rename it into place.
+
+    Readers check ``exists()`` without the render lock (and other processes
+    never see it), so the final name must only ever hold a complete file. A
+    process that loses a race replaces the report with identical bytes.
+    """
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.render-', suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for chunk in pdf_file.chunks():
+                fh.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _render_report(ds, name, options, summary):
+    """Render and store the report unless it exists; False if it did. No database access."""
+    with _lock_for(name):
+        if default_storage.exists(name):
+            return False
+        with metrics.stage('report_render', rows=SAMPLE_ROWS):
+            df = pd.read_csv(ds.file.path, nrows=SAMPLE_ROWS)
+            df.columns = [c.strip() for c in df.columns]
+            anomalies = ensure_anomalies(ensure_columns(ds))
+            pdf_file = generate_pdf_report(summary, df, title=options['title'], anomalies=anomalies)
+            _publish(name, pdf_file)
+    return True
+
+
+def _record_report(ds, name):
+    if ds.pdf_report.name != name:
+        ds.pdf_report.name = name
+        type(ds).objects.filter(pk=ds.pk).update(pdf_report=name)
+        invalidate_dataset(ds.pk)
+
+
+def get_or_render_report(ds):
+    """Return the storage name of the dataset's PDF report, rendering it on first use.
+
+    Reports are cached by content hash and options, so repeat requests and
+    identical re-uploads reuse the same file.
+    """
+    ds.ensure_content_hash()
+    options = report_options()
+    name = report_cache_name(ds.content_hash, options)
+    rendered = not default_storage.exists(name) and _render_report(ds, name, options, ds.get_summary())
+    metrics.incr('report_cache_misses' if rendered else 'report_cache_hits')
+    _record_report(ds, name)
+    return name
+
+
+async def aget_or_render_report(ds):
+    """Async ``get_or_render_report``: the render runs on the executor, off the event loop."""
+    if not ds.content_hash:
+        await sync_to_async(ds.ensure_content_hash)()
+    options = report_options()
+    name = report_cache_name(ds.content_hash, options)
+    rendered = False
+    if not default_storage.exists(name):
+        summary = await sync_to_async(ds.get_summary)()
+        rendered = await sync_to_async(_render_report, thread_sensitive=False)(ds, name, options, summary)
+    metrics.incr('report_cache_misses' if rendered else 'report_cache_hits')
+    if ds.pdf_report.name != name:
+        await sync_to_async(_record_report)(ds, name)
+    return name
@@ -0,0 +1,220 @@
+"""Dataset retention and media reconciliation.
+
+``apply_retention()`` picks expired datasets with a few narrow queries
+(keep-N, max-age and max-bytes policies from settings), deletes their rows in
+one transaction and hands the now-unreferenced files to a background cleanup
+thread. ``reconcile_media()`` sweeps MEDIA_ROOT for files no dataset refers
+to (left behind by failed deletes, appends or crashes); it runs at most every
+RETENTION_RECONCILE_INTERVAL seconds after retention and from the
+``reconcile_media`` management command. ``fail_stale_jobs()`` marks datasets
+whose in-process job was lost (restart, crash) as failed, so clients stop
+polling them and retention can delete them.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import metrics
+from .columnar import columns_root, remove_columns
+from .httpcache import invalidate_dataset
+from .models import Dataset
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = (Dataset.PENDING, Dataset.PROCESSING)
+# Files younger than this are never treated as orphans: uploads store the file
+# before inserting the row and columnar writers publish from temp dirs.
+ORPHAN_GRACE_SECONDS = 3600
+DELETE_BATCH_SIZE = 500
+STALE_JOB_ERROR = "Processing was interrupted (server restart?); upload the file again."
+
+_cleanup = None
+_cleanup_lock = threading.Lock()
+_last_reconcile = None
+
+
+def _cleanup_executor():
+    global _cleanup
+    with _cleanup_lock:
+        if _cleanup is None:
+            _cleanup = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retention')
+        return _cleanup
+
+
+def _in_worker(fn, *args):
+    close_old_connections()
+    try:
+        return fn(*args)
+    except Exception:
+        logger.exception("Media cleanup failed")
+    finally:
+        close_old_connections()
+
+
+def _run_cleanup(fn, *args):
+    """Run ``fn`` on the cleanup thread, or inline when UPLOAD_ASYNC is off."""
+    if not settings.UPLOAD_ASYNC:
+        return fn(*args)
+    return _cleanup_executor().submit(_in_worker, fn, *args)
+
+
+def fail_stale_jobs(now=None):
+    """Mark datasets pending/processing for over UPLOAD_STALE_AFTER seconds as failed; returns how many.
+
+    The upload queue lives in the server process, so its jobs are lost when
+    that process restarts or crashes and nothing would ever finish them.
+    """
+    if settings.UPLOAD_STALE_AFTER is None:
+        return 0
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.UPLOAD_STALE_AFTER)
+    ids = list(Dataset.objects.filter(status__in=IN_FLIGHT, uploaded_at__lt=cutoff).values_list('id', flat=True))
+    if not ids:
+        return 0
+    failed = Dataset.objects.filter(pk__in=ids, status__in=IN_FLIGHT).update(
+        status=Dataset.FAILED, error=STALE_JOB_ERROR)
+    for pk in ids:
+        invalidate_dataset(pk)
+    logger.info("Marked %d stale upload jobs as failed", failed)
+    return failed
+
+
+def select_expired(now=None):
+    """Ids of datasets to delete under the configured policies (never in-flight ones)."""
+    now = now or timezone.now()
+    newest_first = Dataset.objects.order_by('-uploaded_at', '-id')
+    expired = set()
+    keep = settings.RETENTION_KEEP
+    if keep is not None:
+        expired.update(newest_first.values_list('id', flat=True)[keep:])
+    if settings.RETENTION_MAX_AGE is not None:
+        cutoff = now - timedelta(seconds=settings.RETENTION_MAX_AGE)
+        expired.update(Dataset.objects.filter(uploaded_at__lt=cutoff).values_list('id', flat=True))
+    if settings.RETENTION_MAX_BYTES is not None:
+        # Deduplicated datasets share one stored file, which is only counted once.
+        total, seen = 0, set()
+        for pk, name, size in newest_first.exclude(pk__in=expired).values_list('id', 'file', 'file_size'):
+            if name not in seen:
+                seen.add(name)
+                total += size
+            if total > settings.RETENTION_MAX_BYTES:
+                expired.add(pk)
+    if expired:
+        expired -= set(Dataset.objects.filter(pk__in=expired, status__in=IN_FLIGHT).values_list('id', flat=True))
+    return expired
+
+
+def delete_datasets(ids):
+    """Delete datasets in one transaction; their unshared files are removed after commit."""
+    with transaction.atomic():
+        rows = Dataset.objects.filter(pk__in=ids).exclude(status__in=IN_FLIGHT)
+        doomed = list(rows.values_list('file', 'pdf_report', 'content_hash'))
+        deleted = len(doomed)
+        rows.delete()
+        names = {name for file, report, _ in doomed for name in (file, report) if name}
+        hashes = {h for _, _, h in doomed if h}
+        names -= set(Dataset.objects.filter(file__in=names).values_list('file', flat=True))
+        names -= set(Dataset.objects.filter(pdf_report__in=names).values_list('pdf_report', flat=True))
+        hashes -= set(Dataset.objects.filter(content_hash__in=hashes).values_list('content_hash', flat=True))
+        if names or hashes:
+            transaction.on_commit(lambda: _run_cleanup(remove_files, sorted(names), sorted(hashes)))
+    return deleted
+
+
+def remove_files(names, hashes):
+    """Delete stored files and columnar caches in batches; failures are left for reconcile_media().
+
+    References are re-checked per batch, since a deduplicated upload may have
+    started sharing a file after it was queued for removal.
+    """
+    failed = 0
+    for start in range(0, len(names), DELETE_BATCH_SIZE):
+        batch = set(names[start:start + DELETE_BATCH_SIZE])
+        batch -= set(Dataset.objects.filter(file__in=batch).values_list('file', flat=True))
+        batch -= set(Dataset.objects.filter(pdf_report__in=batch).values_list('pdf_report', flat=True))
+        for name in sorted(batch):
+            try:
+                default_storage.delete(name)
+            except OSError:
+                failed += 1
+                logger.warning("Could not delete %s", name, exc_info=True)
+    hashes = set(hashes) - set(Dataset.objects.filter(content_hash__in=hashes).values_list('content_hash', flat=True))
+    for content_hash in hashes:
+        remove_columns(content_hash)
+    return failed
+
+
+def apply_retention(now=None):
+    """Enforce the retention policies; returns the number of datasets deleted."""
+    with metrics.stage('retention'):
+        fail_stale_jobs(now)
+        ids = select_expired(now)
+        deleted = delete_datasets(ids) if ids else 0
+    # Callers may hold a transaction open; sweep media only once it commits.
+    transaction.on_commit(_maybe_reconcile)
+    return deleted
+
+
+def _maybe_reconcile():
+    global _last_reconcile
+    interval = settings.RETENTION_RECONCILE_INTERVAL
+    if not interval:
+        return
+    with _cleanup_lock:
+        if _last_reconcile is not None and time.monotonic() - _last_reconcile < interval:
+            return
+        _last_reconcile = time.monotonic()
+    _run_cleanup(reconcile_media)
+
+
+def _old_enough(path, cutoff):
+    try:
+        return os.path.getmtime(path) < cutoff
+    except OSError:
+        return False
+
+
+def find_orphans(grace=ORPHAN_GRACE_SECONDS):
+    """Storage names and columnar dirs under MEDIA_ROOT that no dataset references."""
+    cutoff = time.time() - grace
+    referenced = set()
+    for file, report in Dataset.objects.values_list('file', 'pdf_report'):
+        referenced.update(name for name in (file, report) if name)
+    hashes = set(Dataset.objects.exclude(content_hash='').values_list('content_hash', flat=True))
+
+    names = []
+    for folder in ('datasets', 'reports'):
+        if not default_storage.exists(folder):
+            continue
+        for filename in default_storage.listdir(folder)[1]:
+            name = f'{folder}/{filename}'
+            if name not in referenced and _old_enough(default_storage.path(name), cutoff):
+                names.append(name)
+    dirs = []
+    root = columns_root()
+    if root.is_dir():
+        for entry in root.iterdir():
+            # Abandoned "<hash>.<random>.tmp" writer dirs are orphans too.
+            if entry.name not in hashes and _old_enough(entry, cutoff):
+                dirs.append(entry)
+    return names, dirs
+
+
+def reconcile_media(grace=ORPHAN_GRACE_SECONDS, dry_run=False):
+    """Remove orphaned media; returns the storage names and directories found."""
+    names, dirs = find_orphans(grace)
+    if not dry_run:
+        remove_files(names, [])
+        for path in dirs:
+            shutil.rmtree(path, ignore_errors=True)
+    if names or dirs:
+        logger.info("Reconciled media: %d orphaned files, %d orphaned column dirs", len(names), len(dirs))
+    return names, dirs
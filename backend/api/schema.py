@@ -0,0 +1,68 @@
+"""Header sniffing and compact dtypes for reading equipment CSVs.
+
+The header is read once; only the columns the summary and the columnar cache
+use (the numeric parameters and ``Type``) are parsed, with fixed dtypes so
+pandas skips type inference: ``category`` for ``Type`` and float64 (or
+float32 when ``float32`` is set) for the numeric columns. The remaining
+columns are skipped by the tokenizer and only appear in the header list.
+Importable without Django set up, like ``pipeline``.
+"""
+import pandas as pd
+
+NUMERIC_COLS = ['Flowrate', 'Pressure', 'Temperature']
+CATEGORY_COLS = ['Type']
+
+
+def pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CsvSchema:
+    """Raw and stripped header names of a CSV, plus ``read_csv`` arguments for its known columns."""
+
+    def __init__(self, header):
+        self.header = list(header)
+        self.columns = [str(c).strip() for c in self.header]
+        known = set(NUMERIC_COLS) | set(CATEGORY_COLS)
+        # Raw name -> stripped name, for the columns that are actually parsed.
+        self.used = {raw: name for raw, name in zip(self.header, self.columns) if name in known}
+
+    @classmethod
+    def sniff(cls, source):
+        """Read only the header of a path or seekable file; files are rewound afterwards."""
+        header = pd.read_csv(source, nrows=0).columns
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return cls(header)
+
+    def dtypes(self, float32=False):
+        numeric = 'float32' if float32 else 'float64'
+        return {raw: ('category' if name in CATEGORY_COLS else numeric) for raw, name in self.used.items()}
+
+    def read_kwargs(self, engine=None, float32=False, chunked=False):
+        """Keyword arguments for ``pd.read_csv``.
+
+        ``engine='pyarrow'`` parses on several threads but cannot stream, so it
+        is only used for whole-file reads and falls back to the C parser when
+        pyarrow is not installed. A CSV without any known column still parses
+        its first column, since pandas returns no rows for an empty ``usecols``.
+        """
+        kwargs = {'usecols': list(self.used) or self.header[:1], 'dtype': self.dtypes(float32)}
+        if engine == 'pyarrow' and not chunked and pyarrow_available():
+            kwargs['engine'] = 'pyarrow'
+        return kwargs
+
+    def rename(self, frame):
+        """Strip the parsed frame's column names in place and return it."""
+        frame.columns = [self.used.get(c, str(c).strip()) for c in frame.columns]
+        return frame
+
+
+def configured_options():
+    """``engine``/``float32`` keyword arguments from the CSV_ENGINE and CSV_FLOAT32 settings."""
+    from django.conf import settings
+    return {'engine': settings.CSV_ENGINE, 'float32': settings.CSV_FLOAT32}
@@ -2,7 +2,14 @@ from rest_framework import serializers
 from .models import Dataset
 
 class DatasetSerializer(serializers.ModelSerializer):
+    """Pass ``fields=[...]`` to serialize only those fields (sparse fieldsets)."""
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Dataset
-        fields = ['id','uploaded_at','original_filename','summary_json','pdf_report','file']
-        read_only_fields = ['id','uploaded_at','summary_json','pdf_report']
+        fields = ['id','uploaded_at','original_filename','total_count','pdf_report','file','status','error','summary_version']
+        read_only_fields = ['id','uploaded_at','total_count','pdf_report','status','error','summary_version']
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .httpcache import invalidate_dataset
+from .models import Dataset
+
+
+@receiver(post_save, sender=Dataset)
+@receiver(post_delete, sender=Dataset)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    invalidate_dataset(instance.pk)
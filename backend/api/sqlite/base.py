@@ -0,0 +1,42 @@
+"""SQLite backend with connection-time PRAGMAs and a configurable transaction mode.
+
+Configured through ``DATABASES[...]['OPTIONS']``; the two extra keys are
+consumed here and everything else goes to ``sqlite3.connect`` as usual:
+
+* ``pragmas``: ``{name: value}`` applied to every new connection, e.g.
+  ``journal_mode = wal`` so readers no longer block the writer.
+* ``transaction_mode``: ``DEFERRED`` (SQLite's default), ``IMMEDIATE`` or
+  ``EXCLUSIVE``, used for the ``BEGIN`` of ``transaction.atomic()``.
+  ``IMMEDIATE`` takes the write lock up front, so a concurrent writer waits
+  out the busy ``timeout`` instead of failing with "database is locked" when
+  its read transaction tries to upgrade.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        mode = params.pop('transaction_mode', None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}, not {mode!r}."
+            )
+        self.transaction_mode = mode.upper() if mode else None
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class RunningStats:
+    """Mergeable count/mean/variance/min/max accumulator (Welford / Chan et al.)."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'total', 'compensation')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=None, max=None, total=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+        # Plain sum kept alongside the Welford mean so reported averages are
+        # ``sum / count`` like pandas, not the drift of repeated mean updates.
+        # Partial sums are added with Neumaier compensation, so a chunked
+        # average agrees with the whole-array one to within a few ulps; it is
+        # not bit-identical, since NumPy sums each chunk in its own order.
+        self.total = mean * count if total is None else total
+        self.compensation = 0.0
+
+    def update(self, values):
+        """Fold an array-like of numbers into the accumulator, ignoring NaNs."""
+        arr = np.asarray(values, dtype='float64')
+        arr = arr[~np.isnan(arr)]
+        n = arr.size
+        if not n:
+            return self
+        total = float(arr.sum())
+        mean = total / n
+        m2 = float(((arr - mean) ** 2).sum())
+        return self.merge(RunningStats(n, mean, m2, float(arr.min()), float(arr.max()), total))
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max, self.total = other.min, other.max, other.total
+            self.compensation = other.compensation
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        total = self.total + other.total
+        if abs(self.total) >= abs(other.total):
+            self.compensation += (self.total - total) + other.total
+        else:
+            self.compensation += (other.total - total) + self.total
+        self.compensation += other.compensation
+        self.total = total
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def sum(self):
+        return self.total + self.compensation
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def std(self):
+        var = self.variance
+        return math.sqrt(var) if var is not None else None
+
+    def average(self):
+        """Mean as reported in summaries: NaN when no values were seen, like pandas."""
+        return self.sum() / self.count if self.count else float('nan')
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.sum() / self.count if self.count else None,
+            'variance': self.variance,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """Rebuild an accumulator from ``as_dict()`` output (or a stored ColumnStat)."""
+        count = d.get('count') or 0
+        if not count:
+            return cls()
+        mean = d['mean']
+        variance = d.get('variance')
+        m2 = variance * (count - 1) if variance is not None else 0.0
+        return cls(count, mean, m2, d.get('min'), d.get('max'), mean * count)
+
+
+STATISTICS = ('count', 'mean', 'std', 'min', 'max', 'percentiles', 'histogram', 'correlation', 'by_type')
+DEFAULT_PERCENTILES = (5, 50, 95)
+DEFAULT_BINS = 20
+
+
+def _clean(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def describe(columns, types=None, percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS, include=STATISTICS):
+    """Extended statistics for numeric columns, computed column-wise in one NumPy pass.
+
+    ``columns`` maps names to 1-D arrays (e.g. memory-mapped columnar data);
+    ``types`` is an optional per-row label array for the grouped statistics.
+    NaNs are ignored everywhere; the correlation matrix uses rows with no NaN.
+    """
+    names = list(columns)
+    result = {'columns': {name: {} for name in names}}
+    if not names:
+        return result
+    # One row per column so every reduction runs over contiguous memory.
+    X = np.stack([np.asarray(columns[name], dtype='float64') for name in names])
+    valid = ~np.isnan(X)
+    has_nan = not valid.all()
+    Xz = np.where(valid, X, 0.0) if has_nan else X
+    count = valid.sum(axis=1)
+    per_stat = {'count': count}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if {'mean', 'std'} & set(include):
+            mean = Xz.sum(axis=1) / count
+            per_stat['mean'] = mean
+        if 'std' in include:
+            dev = Xz - mean[:, None]
+            if has_nan:
+                dev *= valid
+            per_stat['std'] = np.sqrt(np.einsum('ij,ij->i', dev, dev) / (count - 1))
+    if {'min', 'max', 'histogram'} & set(include):
+        per_stat['min'] = lo = np.fmin.reduce(X, axis=1)
+        per_stat['max'] = hi = np.fmax.reduce(X, axis=1)
+
+    for stat in ('count', 'mean', 'std', 'min', 'max'):
+        if stat in include:
+            for i, name in enumerate(names):
+                value = per_stat[stat][i]
+                result['columns'][name][stat] = int(value) if stat == 'count' else _clean(value)
+
+    n = X.shape[1]
+    if 'percentiles' in include and percentiles and n:
+        with np.errstate(invalid='ignore'):
+            pct = np.nanpercentile(X, percentiles, axis=1) if has_nan else np.percentile(X, percentiles, axis=1)
+        for i, name in enumerate(names):
+            result['columns'][name]['percentiles'] = {f'p{q:g}': _clean(pct[j, i]) for j, q in enumerate(percentiles)}
+
+    if 'histogram' in include and bins and n:
+        # Bin every column at once: offset column i's bin ids by i * bins and
+        # count them with a single bincount.
+        span = np.where(hi > lo, hi - lo, 1.0)
+        idx = ((Xz - np.nan_to_num(lo)[:, None]) * (bins / span)[:, None]).astype('int64')
+        np.clip(idx, 0, bins - 1, out=idx)
+        idx += (np.arange(len(names)) * bins)[:, None]
+        counts = np.bincount(idx[valid] if has_nan else idx.ravel(), minlength=len(names) * bins).reshape(len(names), bins)
+        for i, name in enumerate(names):
+            if count[i]:
+                edges = lo[i] + (hi[i] - lo[i]) * np.linspace(0.0, 1.0, bins + 1)
+                result['columns'][name]['histogram'] = {'edges': edges.tolist(), 'counts': counts[i].tolist()}
+
+    if 'correlation' in include:
+        complete = X[:, valid.all(axis=0)] if has_nan else X
+        if complete.shape[1] > 1:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = np.corrcoef(complete).reshape(len(names), len(names))
+            result['correlation'] = {a: {b: _clean(corr[i, j]) for j, b in enumerate(names)} for i, a in enumerate(names)}
+
+    if 'by_type' in include and types is not None:
+        grouped = pd.DataFrame(X.T, columns=names).groupby(types, observed=True, sort=True).agg(['count', 'mean', 'std', 'min', 'max'])
+        result['by_type'] = {
+            str(t): {name: {stat: (int(row[(name, stat)]) if stat == 'count' else _clean(row[(name, stat)]))
+                            for stat in ('count', 'mean', 'std', 'min', 'max')} for name in names}
+            for t, row in grouped.iterrows()
+        }
+    return result
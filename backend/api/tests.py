@@ -1,3 +1,543 @@
-from django.test import TestCase
+import io
+import math
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from benchmarks.suite import compare
+from benchmarks.synthetic import make_frame
+from .anomalies import ANY, detect
+from .batch import ORIGINAL_DELETED, ingest_batch, process_batch
+from .downloads import UnsatisfiableRange, gzip_etag, parse_range
+from .downsample import lttb, minmax
+from .httpcache import response_cache
+from .incremental import append_rows, merge_summaries
+from .models import Dataset
+from .retention import STALE_JOB_ERROR, fail_stale_jobs, select_expired
+from .stats import RunningStats
+from .utils import NUMERIC_COLS, file_sha256, parse_csv_and_summary
+
+
+def csv_bytes(rows, seed=0, **kwargs):
+    return make_frame(rows, seed=seed, **kwargs).to_csv(index=False).encode()
+
+
+class RunningStatsTests(SimpleTestCase):
+    def test_merge_matches_whole_array(self):
+        values = np.random.default_rng(1).normal(50, 10, size=10_001)
+        values[::97] = np.nan
+        whole = RunningStats().update(values)
+        merged = RunningStats()
+        for part in np.array_split(values, 7):
+            merged.merge(RunningStats().update(part))
+        present = values[~np.isnan(values)]
+        self.assertEqual(merged.count, present.size)
+        self.assertEqual(merged.min, present.min())
+        self.assertEqual(merged.max, present.max())
+        self.assertTrue(math.isclose(merged.average(), whole.average(), rel_tol=1e-12))
+        self.assertTrue(math.isclose(merged.variance, present.var(ddof=1), rel_tol=1e-9))
+
+    def test_merge_with_empty(self):
+        acc = RunningStats().update([1.0, 2.0, 3.0])
+        self.assertIs(acc.merge(RunningStats()), acc)
+        self.assertEqual(RunningStats().merge(acc).as_dict(), acc.as_dict())
+        self.assertTrue(math.isnan(RunningStats().average()))
+        self.assertEqual(RunningStats.from_dict(acc.as_dict()).as_dict(), acc.as_dict())
+
+
+class MergeSummariesTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def summarize(self, frame):
+        path = os.path.join(self.tmp, 'part.csv')
+        frame.to_csv(path, index=False)
+        return parse_csv_and_summary(path)[0]
+
+    def test_merge_matches_concatenated_file(self):
+        first = make_frame(3_000, seed=1, types=4, missing=0.02)
+        second = make_frame(1_000, seed=2, types=6, missing=0.02)
+        merged = merge_summaries(self.summarize(first), self.summarize(second))
+        full = self.summarize(pd.concat([first, second]))
+        self.assertEqual(merged['total_count'], full['total_count'])
+        self.assertEqual(merged['type_distribution'], full['type_distribution'])
+        self.assertEqual(list(merged['type_distribution'].values()),
+                         sorted(merged['type_distribution'].values(), reverse=True))
+        for col in NUMERIC_COLS:
+            got, want = merged['statistics'][col], full['statistics'][col]
+            self.assertEqual(got['count'], want['count'])
+            self.assertEqual((got['min'], got['max']), (want['min'], want['max']))
+            self.assertTrue(math.isclose(got['mean'], want['mean'], rel_tol=1e-12))
+            self.assertTrue(math.isclose(got['variance'], want['variance'], rel_tol=1e-9))
+            self.assertEqual(merged['averages'][col], got['mean'])
+
+
+class ParseCsvTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'data.csv')
+        make_frame(50_000, seed=4, types=9, missing=0.01).to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_chunked_matches_full(self):
+        full, _ = parse_csv_and_summary(self.path)
+        chunked, head = parse_csv_and_summary(self.path, chunksize=7_777)
+        self.assertEqual(chunked['total_count'], full['total_count'])
+        self.assertEqual(chunked['type_distribution'], full['type_distribution'])
+        self.assertEqual(chunked['columns'], full['columns'])
+        self.assertEqual(len(head), 10)
+        for col in NUMERIC_COLS:
+            # Chunk partial sums are added in a different order: equal within float tolerance.
+            self.assertTrue(math.isclose(chunked['averages'][col], full['averages'][col], rel_tol=1e-12))
+            for stat in ('count', 'min', 'max'):
+                self.assertEqual(chunked['statistics'][col][stat], full['statistics'][col][stat])
+            self.assertTrue(math.isclose(chunked['statistics'][col]['variance'], full['statistics'][col]['variance'],
+                                         rel_tol=1e-9))
+
+    def test_unknown_columns_still_count_rows(self):
+        with open(self.path, 'w') as fh:
+            fh.write('A,B\n1,2\n3,4\n5,6\n')
+        for chunksize in (None, 2):
+            summary, _ = parse_csv_and_summary(self.path, chunksize=chunksize)
+            self.assertEqual(summary['total_count'], 3)
+            self.assertEqual(summary['columns'], ['A', 'B'])
+
+
+class DownsampleTests(SimpleTestCase):
+    def setUp(self):
+        self.x = np.arange(10_000, dtype='float64')
+        self.y = np.sin(self.x / 500) + np.random.default_rng(0).normal(scale=0.1, size=self.x.size)
+        self.y[1234] = 25.0
+
+    def test_lttb(self):
+        xs, ys = lttb(self.x, self.y, 200)
+        self.assertEqual(len(xs), 200)
+        self.assertEqual((xs[0], xs[-1]), (self.x[0], self.x[-1]))
+        self.assertTrue(np.all(np.diff(xs) > 0))
+        np.testing.assert_array_equal(ys, self.y[xs.astype(int)])
+        self.assertIn(1234.0, xs)
+
+    def test_lttb_small_thresholds_return_input(self):
+        for threshold in (2, len(self.x), len(self.x) + 1):
+            xs, ys = lttb(self.x, self.y, threshold)
+            self.assertIs(xs, self.x)
+            self.assertIs(ys, self.y)
+
+    def test_minmax(self):
+        xs, ys = minmax(self.x, self.y, 100)
+        self.assertLessEqual(len(xs), 100)
+        self.assertTrue(np.all(np.diff(xs) > 0))
+        np.testing.assert_array_equal(ys, self.y[xs.astype(int)])
+        for bucket in np.array_split(np.arange(len(self.x)), 50):
+            self.assertIn(bucket[np.argmin(self.y[bucket])], xs)
+            self.assertIn(bucket[np.argmax(self.y[bucket])], xs)
+
+    def test_minmax_partial_last_bucket(self):
+        # 101 points in buckets of 21: the last bucket holds rows 84..100.
+        xs, _ = minmax(self.x[:101], self.y[:101], 10)
+        tail = self.y[84:101]
+        self.assertIn(84 + tail.argmin(), xs)
+        self.assertIn(84 + tail.argmax(), xs)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-5', 100), (95, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_ignored(self):
+        for header in ('', 'bytes=-', 'bytes=1-2,5-6', 'items=0-1', 'bytes=20-10'):
+            self.assertIsNone(parse_range(header, 100), header)
+
+    def test_unsatisfiable(self):
+        for header, size in (('bytes=100-', 100), ('bytes=150-200', 100), ('bytes=-0', 100), ('bytes=-5', 0)):
+            with self.assertRaises(UnsatisfiableRange):
+                parse_range(header, size)
+
+
+class DetectTests(SimpleTestCase):
+    def setUp(self):
+        self.frame = make_frame(5_000, seed=3, missing=0.02)
+        self.frame.loc[[10, 20, 30], 'Pressure'] = [50.0, -40.0, 99.0]
+        self.columns = {col: self.frame[col].to_numpy('float64') for col in NUMERIC_COLS}
+        self.types = pd.Categorical(self.frame['Type'])
+        self.config = {'zscore': 3.0, 'iqr': 1.5, 'thresholds': {
+            '*': {'Temperature': [None, 150.0]},
+            'Pump': {'Temperature': [None, 140.0]},
+        }}
+
+    def test_zscore_and_iqr(self):
+        manifest, flagged = detect(self.columns, self.types, self.config)
+        pressure = self.frame['Pressure']
+        zscore = ((pressure - pressure.mean()).abs() > 3 * pressure.std()).to_numpy()
+        np.testing.assert_array_equal(flagged['zscore.Pressure'], np.flatnonzero(zscore))
+        q1, q3 = pressure.quantile([0.25, 0.75])
+        iqr = ((pressure < q1 - 1.5 * (q3 - q1)) | (pressure > q3 + 1.5 * (q3 - q1))).to_numpy()
+        np.testing.assert_array_equal(flagged['iqr.Pressure'], np.flatnonzero(iqr))
+        for row in (10, 20, 30):
+            self.assertIn(row, flagged['zscore.Pressure'])
+        self.assertEqual(manifest['rules']['zscore']['Pressure']['count'], zscore.sum())
+        self.assertEqual(manifest['rows'], len(self.frame))
+
+    def test_per_type_thresholds(self):
+        manifest, flagged = detect(self.columns, self.types, self.config)
+        limit = np.where(self.frame['Type'] == 'Pump', 140.0, 150.0)
+        expected = np.flatnonzero((self.frame['Temperature'] > limit).to_numpy())
+        np.testing.assert_array_equal(flagged['threshold.Temperature'], expected)
+        self.assertNotIn('threshold.Pressure', flagged)
+        self.assertEqual(flagged['threshold.Temperature'].dtype, np.dtype('<i4'))
+
+    def test_any_and_by_type(self):
+        manifest, flagged = detect(self.columns, self.types, self.config)
+        union = np.unique(np.concatenate([v for k, v in flagged.items() if k != ANY]))
+        np.testing.assert_array_equal(flagged[ANY], union)
+        self.assertEqual(manifest['flagged'], len(union))
+        self.assertEqual(sum(manifest['by_type'].values()), len(union))
+        self.assertEqual(manifest['keys'], sorted(flagged))
+
+    def test_missing_values_never_flagged(self):
+        _, flagged = detect(self.columns, self.types, self.config)
+        missing = np.flatnonzero(np.isnan(self.columns['Pressure']))
+        self.assertFalse(np.isin(missing, flagged['iqr.Pressure']).any())
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    baseline = {'micro.fast': 0.001, 'load.p50': 0.010}
+    noise = {'micro.fast': 0.0001, 'load.p50': 0.004}
+
+    def regressed(self, timings, **kwargs):
+        return {case for case, *_, flagged in compare(timings, self.baseline, 0.3, self.noise, **kwargs) if flagged}
+
+    def test_small_cases_are_checked_against_their_spread(self):
+        self.assertEqual(self.regressed({'micro.fast': 0.00125}), set())
+        self.assertEqual(self.regressed({'micro.fast': 0.0014}), {'micro.fast'})
+
+    def test_slowdowns_within_the_spread_are_not_flagged(self):
+        self.assertEqual(self.regressed({'load.p50': 0.020}), set())
+        self.assertEqual(self.regressed({'load.p50': 0.023}), {'load.p50'})
+        self.assertEqual(self.regressed({'load.p50': 0.023}, load_tolerance=1.5), set())
+
+    def test_scale_relaxes_timings_and_spreads(self):
+        self.assertEqual(self.regressed({'micro.fast': 0.0014}, scale=1.1), set())
+        self.assertEqual(self.regressed({'new': 1.0}), set())
+
+
+@override_settings(RETENTION_KEEP=None, RETENTION_MAX_AGE=None, RETENTION_MAX_BYTES=None)
+class SelectExpiredTests(TestCase):
+    def make(self, name, age, size=100, status=Dataset.READY):
+        ds = Dataset.objects.create(file=f'datasets/{name}', file_size=size, original_filename=name, status=status)
+        Dataset.objects.filter(pk=ds.pk).update(uploaded_at=timezone.now() - timedelta(seconds=age))
+        return ds.pk
+
+    def test_keep(self):
+        ids = [self.make(f'{i}.csv', age=100 - i) for i in range(5)]
+        self.assertEqual(select_expired(), set())
+        with override_settings(RETENTION_KEEP=2):
+            self.assertEqual(select_expired(), set(ids[:3]))
+
+    def test_max_age(self):
+        old, new = self.make('old.csv', age=7200), self.make('new.csv', age=60)
+        with override_settings(RETENTION_MAX_AGE=3600):
+            self.assertEqual(select_expired(), {old})
+
+    def test_max_bytes_counts_shared_files_once(self):
+        oldest = self.make('a.csv', age=300)
+        shared = [self.make('b.csv', age=200 - i) for i in range(3)]
+        newest = self.make('c.csv', age=10)
+        with override_settings(RETENTION_MAX_BYTES=200):
+            self.assertEqual(select_expired(), {oldest})
+        with override_settings(RETENTION_MAX_BYTES=150):
+            self.assertEqual(select_expired(), {oldest, *shared})
+        self.assertIn(newest, Dataset.objects.values_list('id', flat=True))
+
+    def test_in_flight_never_expired(self):
+        pending = self.make('p.csv', age=500, status=Dataset.PENDING)
+        processing = self.make('q.csv', age=400, status=Dataset.PROCESSING)
+        failed = self.make('f.csv', age=300, status=Dataset.FAILED)
+        self.make('r.csv', age=10)
+        with override_settings(RETENTION_KEEP=1):
+            self.assertEqual(select_expired(), {failed})
+
+
+@override_settings(UPLOAD_STALE_AFTER=3600)
+class StaleJobTests(TestCase):
+    def make(self, status, age):
+        ds = Dataset.objects.create(file='datasets/x.csv', original_filename='x.csv', status=status)
+        Dataset.objects.filter(pk=ds.pk).update(uploaded_at=timezone.now() - timedelta(seconds=age))
+        return ds.pk
+
+    def test_lost_jobs_are_failed(self):
+        pending = self.make(Dataset.PENDING, 7200)
+        processing = self.make(Dataset.PROCESSING, 7200)
+        recent = self.make(Dataset.PROCESSING, 60)
+        ready = self.make(Dataset.READY, 7200)
+        self.assertEqual(fail_stale_jobs(), 2)
+        statuses = dict(Dataset.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {pending: Dataset.FAILED, processing: Dataset.FAILED,
+                                    recent: Dataset.PROCESSING, ready: Dataset.READY})
+        self.assertEqual(Dataset.objects.get(pk=pending).error, STALE_JOB_ERROR)
+        with override_settings(UPLOAD_STALE_AFTER=None):
+            self.make(Dataset.PENDING, 7200)
+            self.assertEqual(fail_stale_jobs(), 0)
+
+    def test_retention_expires_lost_jobs(self):
+        stale = self.make(Dataset.PENDING, 7200)
+        self.make(Dataset.READY, 10)
+        with override_settings(RETENTION_KEEP=1, RETENTION_MAX_AGE=None, RETENTION_MAX_BYTES=None):
+            fail_stale_jobs()
+            self.assertEqual(select_expired(), {stale})
+
+    def test_status_endpoint_reports_lost_jobs(self):
+        User.objects.create_user('tester', password='secret')
+        client = APIClient()
+        client.login(username='tester', password='secret')
+        pk = self.make(Dataset.PROCESSING, 7200)
+        body = client.get(f'/api/datasets/{pk}/status/').json()
+        self.assertEqual((body['status'], body['error']), (Dataset.FAILED, STALE_JOB_ERROR))
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        overrides = override_settings(MEDIA_ROOT=self.media, UPLOAD_ASYNC=False, RETENTION_KEEP=None)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        response_cache.clear()
+        User.objects.create_user('tester', password='secret')
+        self.client = APIClient()
+        self.client.login(username='tester', password='secret')
+
+    def upload(self, name, data):
+        return self.client.post('/api/upload/', {'file': SimpleUploadedFile(name, data)}, format='multipart')
+
+
+class DatasetListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.names = [f'f{i}.csv' for i in range(8)]
+        for i, name in enumerate(self.names):
+            self.assertEqual(self.upload(name, csv_bytes(20, seed=i)).status_code, 201)
+
+    def test_cursor_pagination(self):
+        page = self.client.get('/api/datasets/').json()
+        self.assertEqual(set(page), {'next', 'previous', 'results'})
+        self.assertEqual([d['original_filename'] for d in page['results']], self.names[::-1][:5])
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([d['original_filename'] for d in rest['results']], self.names[::-1][5:])
+        self.assertIsNone(rest['next'])
+        sized = self.client.get('/api/datasets/?page_size=3').json()
+        self.assertEqual(len(sized['results']), 3)
+
+    def test_sparse_fields(self):
+        page = self.client.get('/api/datasets/?fields=id,original_filename&page_size=2').json()
+        self.assertEqual([set(d) for d in page['results']], [{'id', 'original_filename'}] * 2)
+        response = self.client.get('/api/datasets/?fields=id,nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+
+class UploadDedupTests(ApiTestCase):
+    def test_identical_bytes_share_the_stored_file(self):
+        data = csv_bytes(200, seed=5)
+        first = self.upload('a.csv', data).json()
+        second = self.upload('b.csv', data).json()
+        self.assertNotIn('duplicate_of', first)
+        self.assertEqual(second['duplicate_of'], first['id'])
+        self.assertEqual(second['original_filename'], 'b.csv')
+        self.assertEqual(second['file'], first['file'])
+        self.assertEqual(len(os.listdir(os.path.join(self.media, 'datasets'))), 1)
+        a, b = Dataset.objects.get(pk=first['id']), Dataset.objects.get(pk=second['id'])
+        self.assertEqual(a.content_hash, b.content_hash)
+        self.assertEqual(a.get_summary(), b.get_summary())
+
+    def test_different_bytes_are_not_deduplicated(self):
+        self.upload('a.csv', csv_bytes(200, seed=5))
+        other = self.upload('b.csv', csv_bytes(200, seed=6)).json()
+        self.assertNotIn('duplicate_of', other)
+        self.assertEqual(len(os.listdir(os.path.join(self.media, 'datasets'))), 2)
+
+
+class DatasetFileTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = csv_bytes(200, seed=7)
+        self.url = f"/api/datasets/{self.upload('a.csv', self.data).json()['id']}/file/"
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        return response, b''.join(response.streaming_content) if response.streaming else b''
+
+    def test_gzip_has_its_own_etag(self):
+        identity, body = self.get()
+        self.assertEqual(body, self.data)
+        compressed, _ = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['ETag'], gzip_etag(identity['ETag']))
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])[0].status_code, 304)
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=identity['ETag'])[0].status_code, 200)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=compressed['ETag'])[0].status_code, 200)
+
+    def test_if_range_with_the_gzip_etag_sends_the_whole_file(self):
+        compressed, _ = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        response, body = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=10-', HTTP_IF_RANGE=compressed['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(body, self.data)
+        identity, _ = self.get()
+        response, body = self.get(HTTP_RANGE='bytes=10-', HTTP_IF_RANGE=identity['ETag'])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[10:])
+
+
+class AppendRowsTests(ApiTestCase):
+    def append(self, pk, data):
+        # The merged file is hashed after the append commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/datasets/{pk}/append/', {'file': SimpleUploadedFile('delta.csv', data)},
+                                    format='multipart')
+
+    def assertAppendRolledBack(self, pk, data, files):
+        ds = Dataset.objects.get(pk=pk)
+        with mock.patch('api.incremental.merge_summaries', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                append_rows(ds, SimpleUploadedFile('delta.csv', csv_bytes(10, seed=9)))
+        ds.refresh_from_db()
+        self.assertEqual(ds.summary_version, 1)
+        self.assertEqual(ds.get_summary()['total_count'], 100)
+        with ds.file.open('rb') as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.media, 'datasets'))), files)
+
+    def test_failed_append_restores_the_file(self):
+        data = csv_bytes(100, seed=3)
+        pk = self.upload('a.csv', data).json()['id']
+        self.assertAppendRolledBack(pk, data, ['a.csv'])
+
+    def test_failed_append_drops_the_copy(self):
+        data = csv_bytes(100, seed=3)
+        pk = self.upload('a.csv', data).json()['id']
+        self.upload('b.csv', data)
+        self.assertAppendRolledBack(pk, data, ['a.csv'])
+
+    def test_append_copies_a_shared_file(self):
+        data = csv_bytes(300, seed=1)
+        first = self.upload('a.csv', data).json()
+        second = self.upload('b.csv', data).json()
+        delta = csv_bytes(40, seed=2)
+        response = self.append(first['id'], delta)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_count'], 340)
+
+        ds, other = Dataset.objects.get(pk=first['id']), Dataset.objects.get(pk=second['id'])
+        self.assertNotEqual(ds.file.name, other.file.name)
+        with other.file.open('rb') as fh:
+            self.assertEqual(fh.read(), data)
+        with ds.file.open('rb') as fh:
+            self.assertEqual(fh.read(), data + delta.split(b'\n', 1)[1])
+        self.assertEqual(ds.content_hash, file_sha256(ds.file))
+        self.assertEqual(other.get_summary()['total_count'], 300)
+        self.assertEqual(ds.summary_version, other.summary_version + 1)
+
+        full, _ = parse_csv_and_summary(ds.file.path)
+        got = ds.get_summary()
+        self.assertEqual(got['type_distribution'], full['type_distribution'])
+        for col in NUMERIC_COLS:
+            self.assertEqual(got['statistics'][col]['count'], full['statistics'][col]['count'])
+            self.assertTrue(math.isclose(got['statistics'][col]['mean'], full['statistics'][col]['mean'],
+                                         rel_tol=1e-12))
+
+    def test_appended_file_deduplicates_like_an_upload(self):
+        data, delta = csv_bytes(100, seed=3), csv_bytes(10, seed=4)
+        pk = self.upload('a.csv', data).json()['id']
+        self.append(pk, delta)
+        again = self.upload('c.csv', data + delta.split(b'\n', 1)[1]).json()
+        self.assertEqual(again['duplicate_of'], pk)
+
+    def test_mismatched_columns(self):
+        pk = self.upload('a.csv', csv_bytes(50)).json()['id']
+        response = self.append(pk, b'A,B\n1,2\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Dataset.objects.get(pk=pk).summary_version, 1)
+
+
+class BatchUploadTests(ApiTestCase):
+    def post(self, *files):
+        return self.client.post('/api/upload/batch/', {'files': list(files)}, format='multipart')
+
+    def test_rejected_batch_stores_nothing(self):
+        response = self.post(SimpleUploadedFile('a.csv', csv_bytes(20)), SimpleUploadedFile('b.zip', b'not a zip'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+        self.assertEqual(os.listdir(self.media), [])
+
+    def test_corrupt_member_removes_the_stored_files(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as zf:
+            zf.writestr('b.csv', csv_bytes(20, seed=1))
+        data = buf.getvalue().replace(b'Pressure', b'Pressurf', 1)
+        response = self.post(SimpleUploadedFile('a.csv', csv_bytes(20)), SimpleUploadedFile('b.zip', data))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('corrupt', response.json()['error'])
+        self.assertFalse(Dataset.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'datasets')), [])
+
+    def test_duplicate_of_a_deleted_dataset_fails(self):
+        data = csv_bytes(20)
+        pk = self.upload('a.csv', data).json()['id']
+        results = ingest_batch([SimpleUploadedFile('b.csv', data)])
+        self.assertEqual(results[0]['duplicate_of'], pk)
+        Dataset.objects.filter(pk=pk).delete()
+        results = process_batch(results)
+        self.assertEqual((results[0]['status'], results[0]['error']), (Dataset.FAILED, ORIGINAL_DELETED))
+
+    def test_unexpected_error_fails_the_batch(self):
+        results = ingest_batch([SimpleUploadedFile('a.csv', csv_bytes(20, seed=1)),
+                                SimpleUploadedFile('b.csv', csv_bytes(20, seed=2))])
+        with mock.patch('api.batch.apply_retention', side_effect=RuntimeError('boom')), \
+                self.assertLogs('api.batch', 'ERROR'):
+            results = process_batch(results)
+        self.assertEqual([(r['status'], r['error']) for r in results], [(Dataset.FAILED, 'boom')] * 2)
+        self.assertFalse(Dataset.objects.exclude(status=Dataset.FAILED).exists())
+
+
+class RequestProfilingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(REQUEST_PROFILING=True, REQUEST_PROFILE_TOKEN='s3cret',
+                                      REQUEST_PROFILE_SAMPLE_RATE=1.0, PROFILE_DIR=os.path.join(self.media, 'profiles'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def get(self, client, **headers):
+        return client.get('/api/datasets/', HTTP_X_PROFILE='cprofile', **headers)
+
+    def test_profiles_need_the_token(self):
+        self.assertFalse(self.get(APIClient()).has_header('X-Profile-Dump'))
+        self.assertFalse(self.get(self.client, HTTP_X_PROFILE_TOKEN='guess').has_header('X-Profile-Dump'))
+        response = self.get(APIClient(), HTTP_X_PROFILE_TOKEN='s3cret')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'profiles')), [response['X-Profile-Dump']])
+
+    @override_settings(REQUEST_PROFILE_TOKEN=None)
+    def test_no_token_disables_profiling(self):
+        self.assertFalse(self.get(self.client, HTTP_X_PROFILE_TOKEN='').has_header('X-Profile-Dump'))
@@ -0,0 +1,118 @@
+import hashlib
+import zlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+
+GZIP_CONTENT_TYPES = ('application/gzip', 'application/x-gzip')
+
+
+def is_gzip(file_name, content_type):
+    return content_type in GZIP_CONTENT_TYPES or (file_name or '').lower().endswith('.gz')
+
+
+class GzipDecoder:
+    """Incremental gunzip (concatenated members allowed) with a cap on the output size."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.size = 0
+        self._inflate = zlib.decompressobj(wbits=31)
+
+    def decode(self, data):
+        out = []
+        while data:
+            try:
+                out.append(self._inflate.decompress(data))
+            except zlib.error as exc:
+                raise MultiPartParserError(f"Invalid gzip data: {exc}")
+            data = self._inflate.unused_data
+            if data:
+                self._inflate = zlib.decompressobj(wbits=31)
+        chunk = b''.join(out)
+        self.size += len(chunk)
+        if self.limit is not None and self.size > self.limit:
+            raise MultiPartParserError("Decompressed upload exceeds UPLOAD_MAX_DECOMPRESSED_BYTES")
+        return chunk
+
+    def finish(self):
+        if not self._inflate.eof:
+            raise MultiPartParserError("Truncated gzip data")
+
+
+class ContentHashMixin:
+    """Compute a SHA-256 of each uploaded file while it is being written.
+
+    The digest is attached to the resulting UploadedFile as ``content_hash``
+    so duplicate detection never has to re-read the file.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None:
+            # This handler consumed the chunk, so it is the one building the file.
+            self.hasher.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.content_hash = self.hasher.hexdigest()
+        return uploaded
+
+
+class GunzipMixin:
+    """Store gzip-compressed file parts (``application/gzip`` or ``*.gz``) decompressed.
+
+    The body is inflated as it streams in, so the stored file, its size and
+    its content hash are those of the plain CSV, and a trailing ``.gz`` is
+    dropped from the file name.
+    """
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        self.decoder = None
+        if is_gzip(file_name, content_type):
+            self.decoder = GzipDecoder(settings.UPLOAD_MAX_DECOMPRESSED_BYTES)
+            if file_name.lower().endswith('.gz'):
+                file_name = file_name[:-3]
+            content_type = 'text/csv'
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.decoder is None:
+            return super().receive_data_chunk(raw_data, start)
+        data = self.decoder.decode(raw_data)
+        if data:
+            super().receive_data_chunk(data, self.decoder.size - len(data))
+        return None
+
+    def file_complete(self, file_size):
+        if self.decoder is None:
+            return super().file_complete(file_size)
+        self.decoder.finish()
+        return super().file_complete(self.decoder.size)
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    def handle_raw_input(self, *args, **kwargs):
+        super().handle_raw_input(*args, **kwargs)
+        self.fits_in_memory = self.activated
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        # Decided per part: a gzip part must not keep later plain parts of the
+        # same request out of memory.
+        self.activated = getattr(self, 'fits_in_memory', self.activated)
+        if is_gzip(file_name, content_type):
+            # The inflated size is unknown up front, so compressed parts
+            # always go to the temporary-file handler.
+            self.activated = False
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+
+
+class HashingTemporaryFileUploadHandler(GunzipMixin, ContentHashMixin, TemporaryFileUploadHandler):
+    pass
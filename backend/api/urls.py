@@ -1,10 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from .views import UploadCSVView, DatasetListView, DatasetDetailView, SummaryView, ReportDownloadView
+from .views import UploadCSVView, BatchUploadView, DatasetListView, CompareView, DatasetDetailView, SummaryView, StatisticsView, SeriesView, AnomaliesView, AppendRowsView, JobStatusView, ReportDownloadView, ReportFileView, DatasetFileView, MetricsView
+from .views import AsyncDatasetDetailView, AsyncSummaryView, AsyncReportFileView
+
+if settings.ASYNC_VIEWS:
+    DatasetDetailView, SummaryView, ReportFileView = AsyncDatasetDetailView, AsyncSummaryView, AsyncReportFileView
 
 urlpatterns = [
     path('upload/', UploadCSVView.as_view(), name='upload'),
+    path('upload/batch/', BatchUploadView.as_view(), name='upload-batch'),
     path('datasets/', DatasetListView.as_view(), name='datasets'),
+    path('datasets/compare/', CompareView.as_view(), name='datasets-compare'),
     path('datasets/<int:pk>/', DatasetDetailView.as_view(), name='dataset-detail'),
     path('datasets/<int:pk>/summary/', SummaryView.as_view(), name='dataset-summary'),
+    path('datasets/<int:pk>/statistics/', StatisticsView.as_view(), name='dataset-statistics'),
+    path('datasets/<int:pk>/series/', SeriesView.as_view(), name='dataset-series'),
+    path('datasets/<int:pk>/anomalies/', AnomaliesView.as_view(), name='dataset-anomalies'),
+    path('datasets/<int:pk>/append/', AppendRowsView.as_view(), name='dataset-append'),
+    path('datasets/<int:pk>/status/', JobStatusView.as_view(), name='dataset-status'),
     path('datasets/<int:pk>/report/', ReportDownloadView.as_view(), name='dataset-report'),
+    path('datasets/<int:pk>/report/file/', ReportFileView.as_view(), name='dataset-report-file'),
+    path('datasets/<int:pk>/file/', DatasetFileView.as_view(), name='dataset-file'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,9 +1,38 @@
+import os
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework.views import APIView
 from rest_framework import generics, status, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from .models import Dataset
+from .pagination import DatasetCursorPagination
+from .renderers import PrometheusRenderer
 from .serializers import DatasetSerializer
-from .utils import parse_csv_and_summary, generate_pdf_report
+from . import metrics
+from .anomalies import ANY, RULES as ANOMALY_RULES, ensure_anomalies, load_flagged
+from .asyncapi import AsyncAPIView
+from .columnar import ensure_columns, load_columns
+from .compare import compare_datasets, comparison_versions
+from .httpcache import cached_response, dataset_etag, datasets_etag, make_etag, not_modified, response_cache, summary_etag
+from .downloads import serve_file
+from .downsample import METHODS as DOWNSAMPLE_METHODS, downsample
+from .batch import BatchError, ingest_batch, submit_batch
+from .incremental import AppendError, append_rows
+from .jobs import submit_dataset
+from .reports import aget_or_render_report, get_or_render_report
+from .retention import IN_FLIGHT, apply_retention, fail_stale_jobs
+from .stats import DEFAULT_BINS, describe
+from .utils import NUMERIC_COLS, uploaded_sha256
 
 class UploadCSVView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -11,42 +40,372 @@ class UploadCSVView(APIView):
         f = request.FILES.get('file')
         if not f:
             return Response({"error":"No file provided"}, status=status.HTTP_400_BAD_REQUEST)
-        ds = Dataset.objects.create(file=f, original_filename=f.name)
-        summary, df = parse_csv_and_summary(ds.file.path)
-        ds.set_summary(summary)
-        pdf_file = generate_pdf_report(summary, df, title=f"Report: {ds.original_filename}")
-        ds.pdf_report.save(f"{ds.id}_report.pdf", pdf_file)
-        all_ds = Dataset.objects.order_by('-uploaded_at')
-        if all_ds.count() > 5:
-            for old in all_ds[5:]:
-                try:
-                    old.file.delete(save=False)
-                    if old.pdf_report:
-                        old.pdf_report.delete(save=False)
-                    old.delete()
-                except Exception:
-                    pass
-        serializer = DatasetSerializer(ds)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        content_hash = getattr(f, 'content_hash', None)
+        if not content_hash:
+            with metrics.stage('hash', bytes=f.size):
+                content_hash = uploaded_sha256(f)
+        original = Dataset.objects.filter(content_hash=content_hash, status=Dataset.READY).order_by('-uploaded_at').first()
+        if original:
+            # Identical bytes: share the stored file, summary and cached report.
+            summary = original.get_summary()
+            with transaction.atomic():
+                with metrics.stage('dedup'):
+                    ds = Dataset.objects.create(
+                        file=original.file.name, file_size=original.file_size, original_filename=f.name,
+                        content_hash=content_hash, status=Dataset.READY,
+                    )
+                    ds.set_summary(summary)
+                apply_retention()
+            data = DatasetSerializer(ds).data
+            data['duplicate_of'] = original.id
+            return Response(data, status=status.HTTP_201_CREATED)
+        with metrics.stage('store', bytes=f.size):
+            ds = Dataset.objects.create(file=f, file_size=f.size, original_filename=f.name,
+                                        content_hash=content_hash, status=Dataset.PENDING)
+        submit_dataset(ds.id)
+        if not settings.UPLOAD_ASYNC:
+            ds.refresh_from_db()
+            return Response(DatasetSerializer(ds).data, status=status.HTTP_201_CREATED)
+        data = DatasetSerializer(ds).data
+        data['job_id'] = ds.id
+        data['status_url'] = request.build_absolute_uri(reverse('dataset-status', args=[ds.id]))
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+class BatchUploadView(APIView):
+    """Upload many CSVs (``files``, zip archives allowed) and summarize them in parallel."""
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request):
+        files = request.FILES.getlist('files') or request.FILES.getlist('file')
+        if not files:
+            return Response({"error":"No files provided"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = ingest_batch(files)
+        except BatchError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        results = submit_batch(results)
+        if settings.UPLOAD_ASYNC:
+            for r in results:
+                r['status'] = Dataset.PENDING
+                r['status_url'] = request.build_absolute_uri(reverse('dataset-status', args=[r['id']]))
+            return Response({'results': results}, status=status.HTTP_202_ACCEPTED)
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
+def _parse_when(param, value):
+    when = parse_datetime(value)
+    if when is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({param: 'Must be an ISO 8601 date or datetime.'})
+        when = datetime(day.year, day.month, day.day)
+    return timezone.make_aware(when) if timezone.is_naive(when) else when
 
 class DatasetListView(generics.ListAPIView):
+    """Datasets newest first, cursor-paginated (``?cursor=``, ``?page_size=``).
+
+    ``?fields=id,original_filename`` limits the serialized (and queried)
+    fields, ``?filename=`` matches part of the original filename and
+    ``?uploaded_after=`` / ``?uploaded_before=`` take ISO dates or datetimes.
+    ``?column=Pressure&mean_gt=5&mean_lt=8`` filters on a column's average and
+    ``?type=Pump`` on datasets containing that equipment type.
+    """
     serializer_class = DatasetSerializer
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Dataset.objects.order_by('-uploaded_at')[:5]
+    pagination_class = DatasetCursorPagination
+    # Always loaded: the cursor position and the list ETag are built from these.
+    BASE_FIELDS = ('id', 'uploaded_at', 'status', 'summary_version', 'pdf_report')
+
+    def selected_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = set(fields) - set(DatasetSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.selected_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        qs = Dataset.objects.all()
+        params = self.request.query_params
+        fields = self.selected_fields()
+        if fields:
+            qs = qs.only(*dict.fromkeys([*self.BASE_FIELDS, *fields]))
+        if params.get('filename'):
+            qs = qs.filter(original_filename__icontains=params['filename'])
+        for param, lookup in (('uploaded_after', 'gte'), ('uploaded_before', 'lt')):
+            if params.get(param):
+                qs = qs.filter(**{f'uploaded_at__{lookup}': _parse_when(param, params[param])})
+        column = params.get('column')
+        if column:
+            stat_filter = {'column_stats__column': column}
+            for param, lookup in (('mean_gt', 'gt'), ('mean_lt', 'lt')):
+                if params.get(param):
+                    try:
+                        stat_filter[f'column_stats__mean__{lookup}'] = float(params[param])
+                    except ValueError:
+                        raise ValidationError({param: 'Must be a number.'})
+            qs = qs.filter(**stat_filter)
+        if params.get('type'):
+            qs = qs.filter(type_counts__type=params['type'])
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        key = ('datasets', request.build_absolute_uri())
+        entry = response_cache.get(key)
+        if entry is None:
+            generation = response_cache.generation
+            page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+            data = dict(self.get_paginated_response(self.get_serializer(page, many=True).data).data)
+            data['results'] = list(data['results'])
+            entry = (datasets_etag(key[1], page), data)
+            response_cache.set(key, entry, generation)
+        return cached_response(request, *entry)
 
 class DatasetDetailView(generics.RetrieveAPIView):
     serializer_class = DatasetSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Dataset.objects.all()
 
+    def retrieve(self, request, *args, **kwargs):
+        # Serialized file URLs are absolute, so the cache key includes the host.
+        base = request.build_absolute_uri('/')
+        key = ('dataset', kwargs['pk'], base)
+        entry = response_cache.get(key)
+        if entry is None:
+            generation = response_cache.generation
+            ds = self.get_object()
+            entry = (dataset_etag(ds, base), dict(self.get_serializer(ds).data))
+            response_cache.set(key, entry, generation)
+        return cached_response(request, *entry)
+
 class SummaryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, pk):
+        entry = response_cache.get(('summary', pk))
+        if entry is None:
+            generation = response_cache.generation
+            try:
+                ds = Dataset.objects.only('id', 'status', 'error', 'total_count', 'columns', 'summary_version').get(pk=pk)
+            except Dataset.DoesNotExist:
+                return Response(status=404)
+            if ds.status != Dataset.READY:
+                return Response({'status': ds.status, 'error': ds.error}, status=status.HTTP_409_CONFLICT)
+            entry = (summary_etag(ds), ds.get_summary())
+            response_cache.set(('summary', pk), entry, generation)
+        return cached_response(request, *entry)
+
+class AsyncDatasetDetailView(AsyncAPIView):
+    """``DatasetDetailView`` for ASGI (routed when ASYNC_VIEWS is on)."""
+    permission_classes = [permissions.IsAuthenticated]
+    async def get(self, request, pk):
+        base = request.build_absolute_uri('/')
+        key = ('dataset', pk, base)
+        entry = response_cache.get(key)
+        if entry is None:
+            generation = response_cache.generation
+            try:
+                ds = await Dataset.objects.aget(pk=pk)
+            except Dataset.DoesNotExist:
+                return Response(status=404)
+            entry = (dataset_etag(ds, base), dict(DatasetSerializer(ds, context={'request': request}).data))
+            response_cache.set(key, entry, generation)
+        return cached_response(request, *entry)
+
+class AsyncSummaryView(AsyncAPIView):
+    """``SummaryView`` for ASGI (routed when ASYNC_VIEWS is on)."""
+    permission_classes = [permissions.IsAuthenticated]
+    async def get(self, request, pk):
+        entry = response_cache.get(('summary', pk))
+        if entry is None:
+            generation = response_cache.generation
+            try:
+                ds = await Dataset.objects.only('id', 'status', 'error', 'total_count', 'columns', 'summary_version').aget(pk=pk)
+            except Dataset.DoesNotExist:
+                return Response(status=404)
+            if ds.status != Dataset.READY:
+                return Response({'status': ds.status, 'error': ds.error}, status=status.HTTP_409_CONFLICT)
+            entry = (summary_etag(ds), await sync_to_async(ds.get_summary)())
+            response_cache.set(('summary', pk), entry, generation)
+        return cached_response(request, *entry)
+
+class CompareView(APIView):
+    """Merged statistics and Type distributions across datasets, from the stored aggregates.
+
+    Select datasets with ``?ids=1,2,3`` or an upload range
+    (``?uploaded_after=`` / ``?uploaded_before=``, ISO dates or datetimes).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        params = request.query_params
+        datasets = Dataset.objects.all()
+        if params.get('ids'):
+            try:
+                ids = {int(pk) for pk in params['ids'].split(',') if pk.strip()}
+            except ValueError:
+                raise ValidationError({'ids': 'Must be a comma-separated list of dataset ids.'})
+            found = dict(Dataset.objects.filter(pk__in=ids).values_list('id', 'status'))
+            missing = sorted(ids - set(found))
+            if missing:
+                raise ValidationError({'ids': f"Unknown datasets: {', '.join(map(str, missing))}."})
+            pending = {pk: st for pk, st in found.items() if st != Dataset.READY}
+            if pending:
+                return Response({'status': pending, 'error': 'Some datasets are not ready'}, status=status.HTTP_409_CONFLICT)
+            datasets = datasets.filter(pk__in=ids)
+        elif not (params.get('uploaded_after') or params.get('uploaded_before')):
+            raise ValidationError({'detail': 'Pass ids or uploaded_after / uploaded_before.'})
+        for param, lookup in (('uploaded_after', 'gte'), ('uploaded_before', 'lt')):
+            if params.get(param):
+                datasets = datasets.filter(**{f'uploaded_at__{lookup}': _parse_when(param, params[param])})
+        datasets = datasets.filter(status=Dataset.READY)
+        versions = comparison_versions(datasets)
+        if len(versions) > settings.COMPARE_MAX_DATASETS:
+            raise ValidationError({'detail': f"At most {settings.COMPARE_MAX_DATASETS} datasets can be compared."})
+        etag = make_etag('compare', *(f'{pk}-{version}' for pk, version in versions))
+        if not_modified(request, etag):
+            # Skip the aggregation; cached_response answers 304.
+            return cached_response(request, etag, None)
+        return cached_response(request, etag, compare_datasets(datasets))
+
+class StatisticsView(APIView):
+    """Extended statistics (percentiles, histograms, correlation, per-Type) from the columnar cache."""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, pk):
+        try:
+            ds = Dataset.objects.only('id', 'status', 'error', 'file', 'content_hash').get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        if ds.status != Dataset.READY:
+            return Response({'status': ds.status, 'error': ds.error}, status=status.HTTP_409_CONFLICT)
+        try:
+            percentiles = [float(q) for q in request.query_params.get('percentiles', '5,50,95').split(',') if q]
+            bins = int(request.query_params.get('bins', DEFAULT_BINS))
+        except ValueError:
+            raise ValidationError({'detail': 'percentiles must be numbers and bins an integer.'})
+        if not all(0 <= q <= 100 for q in percentiles) or not 0 <= bins <= 1000:
+            raise ValidationError({'detail': 'percentiles must be in [0, 100] and bins in [0, 1000].'})
+        content_hash = ensure_columns(ds)
+        key = f"stats:{content_hash}:{','.join(map(str, percentiles))}:{bins}"
+        result = cache.get(key)
+        if result is None:
+            arrays = load_columns(content_hash)
+            types = arrays.pop('Type', None)
+            result = describe(arrays, types, percentiles=percentiles, bins=bins)
+            cache.set(key, result, None)
+        return Response(result)
+
+class SeriesView(APIView):
+    """Downsampled parameter series: ``?column=Pressure&points=1000&start=&end=&method=lttb|minmax``."""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, pk):
+        try:
+            ds = Dataset.objects.only('id', 'status', 'error', 'file', 'content_hash').get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        if ds.status != Dataset.READY:
+            return Response({'status': ds.status, 'error': ds.error}, status=status.HTTP_409_CONFLICT)
+        params = request.query_params
+        column = params.get('column', 'Pressure')
+        method = params.get('method', 'lttb')
+        if column not in NUMERIC_COLS or method not in DOWNSAMPLE_METHODS:
+            raise ValidationError({'detail': f"column must be one of {NUMERIC_COLS} and method one of {list(DOWNSAMPLE_METHODS)}."})
+        try:
+            points = min(int(params.get('points', settings.SERIES_DEFAULT_POINTS)), settings.SERIES_MAX_POINTS)
+            start = max(int(params.get('start', 0)), 0)
+            end = int(params['end']) if params.get('end') else None
+        except ValueError:
+            raise ValidationError({'detail': 'points, start and end must be integers.'})
+        if points < 3:
+            raise ValidationError({'points': 'Must be at least 3.'})
+        content_hash = ensure_columns(ds)
+        key = f"series:{content_hash}:{column}:{method}:{points}:{start}:{end}"
+        result = cache.get(key)
+        if result is None:
+            values = load_columns(content_hash, [column]).get(column)
+            if values is None:
+                return Response({'error': f"Column {column} not in dataset"}, status=404)
+            x, y = downsample(values, points, start, end, method)
+            result = {'column': column, 'method': method, 'total_points': len(values[start:end]),
+                      'x': x.astype(int).tolist(), 'y': y.tolist()}
+            cache.set(key, result, settings.SERIES_CACHE_TIMEOUT)
+        return Response(result)
+
+class AnomaliesView(APIView):
+    """Rows flagged by the z-score, IQR and per-Type threshold rules.
+
+    ``?rule=zscore|iqr|threshold&column=Pressure`` selects one rule's rows
+    (default: rows flagged by any rule); ``?offset=&limit=`` page through
+    their row indices, returned with the rows' parameter values.
+    """
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, pk):
+        try:
+            ds = Dataset.objects.only('id', 'status', 'error', 'file', 'content_hash').get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        if ds.status != Dataset.READY:
+            return Response({'status': ds.status, 'error': ds.error}, status=status.HTTP_409_CONFLICT)
+        params = request.query_params
+        rule = params.get('rule', ANY)
+        column = params.get('column')
+        if rule not in (ANY, *ANOMALY_RULES) or (rule != ANY and column not in NUMERIC_COLS):
+            raise ValidationError({'detail': f"rule must be one of {[ANY, *ANOMALY_RULES]}; "
+                                             f"rules other than {ANY} need a column from {NUMERIC_COLS}."})
+        try:
+            offset = max(int(params.get('offset', 0)), 0)
+            limit = min(max(int(params.get('limit', 1000)), 0), 10000)
+        except ValueError:
+            raise ValidationError({'detail': 'offset and limit must be integers.'})
+        content_hash = ensure_columns(ds)
+        manifest = ensure_anomalies(content_hash)
+        key = ANY if rule == ANY else f'{rule}.{column}'
+        if key not in manifest['keys']:
+            return Response({'error': f"No {rule} result for {column}"}, status=404)
+        flagged = load_flagged(content_hash, key)
+        page = flagged[offset:offset + limit]
+        columns = load_columns(content_hash)
+        rows = {'index': page.tolist()}
+        for col, values in columns.items():
+            # NaN (and rows without a Type) become null.
+            rows[col] = [None if v != v else v for v in values[page].tolist()]
+        manifest.pop('keys')
+        manifest.update(rule=rule, column=column, total=len(flagged), offset=offset, limit=limit, results=rows)
+        return Response(manifest)
+
+class AppendRowsView(APIView):
+    """Append new CSV rows (same header) to a dataset, merging them into the stored aggregates."""
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request, pk):
+        f = request.FILES.get('file')
+        if not f:
+            return Response({"error":"No file provided"}, status=status.HTTP_400_BAD_REQUEST)
         try:
             ds = Dataset.objects.get(pk=pk)
         except Dataset.DoesNotExist:
             return Response(status=404)
-        return Response(ds.get_summary())
+        if ds.status != Dataset.READY:
+            return Response({'status': ds.status, 'error': ds.error}, status=status.HTTP_409_CONFLICT)
+        try:
+            ds = append_rows(ds, f)
+        except (AppendError, ValueError) as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        summary = ds.get_summary()
+        summary['summary_version'] = ds.summary_version
+        return Response(summary)
+
+class JobStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, pk):
+        try:
+            ds = Dataset.objects.only('id', 'status', 'error').get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        if ds.status in IN_FLIGHT and fail_stale_jobs():
+            ds.refresh_from_db(fields=['status', 'error'])
+        return Response({'id': ds.id, 'status': ds.status, 'error': ds.error})
 
 class ReportDownloadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -55,6 +414,59 @@ class ReportDownloadView(APIView):
             ds = Dataset.objects.get(pk=pk)
         except Dataset.DoesNotExist:
             return Response(status=404)
-        if not ds.pdf_report:
-            return Response({"error":"Report not found"}, status=404)
+        if ds.status != Dataset.READY:
+            return Response({"error":"Report not available yet", "status": ds.status}, status=status.HTTP_409_CONFLICT)
+        get_or_render_report(ds)
         return Response({'report_url': request.build_absolute_uri(ds.pdf_report.url)})
+
+class ReportFileView(APIView):
+    """The PDF report itself, streamed (rendered and cached on first request)."""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, pk):
+        try:
+            ds = Dataset.objects.get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        if ds.status != Dataset.READY:
+            return Response({"error":"Report not available yet", "status": ds.status}, status=status.HTTP_409_CONFLICT)
+        name = get_or_render_report(ds)
+        stem = os.path.splitext(ds.original_filename)[0]
+        # Report names are already a digest of content hash + report options.
+        etag = f'"{os.path.splitext(os.path.basename(name))[0]}"'
+        return serve_file(request, default_storage.path(name), 'application/pdf', f"{stem}_report.pdf", etag)
+
+class AsyncReportFileView(AsyncAPIView):
+    """``ReportFileView`` for ASGI: rendering runs on the executor and the file streams asynchronously."""
+    permission_classes = [permissions.IsAuthenticated]
+    async def get(self, request, pk):
+        try:
+            ds = await Dataset.objects.aget(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        if ds.status != Dataset.READY:
+            return Response({"error":"Report not available yet", "status": ds.status}, status=status.HTTP_409_CONFLICT)
+        name = await aget_or_render_report(ds)
+        stem = os.path.splitext(ds.original_filename)[0]
+        etag = f'"{os.path.splitext(os.path.basename(name))[0]}"'
+        return serve_file(request, default_storage.path(name), 'application/pdf', f"{stem}_report.pdf", etag,
+                          asynchronous=True)
+
+class DatasetFileView(APIView):
+    """The uploaded CSV, streamed with Range support and gzip when the client accepts it."""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, pk):
+        try:
+            ds = Dataset.objects.only('id', 'file', 'original_filename', 'content_hash').get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(status=404)
+        etag = f'"{ds.ensure_content_hash()}"'
+        return serve_file(request, ds.file.path, 'text/csv', ds.original_filename, etag, as_attachment=True, gzip=True)
+
+class MetricsView(APIView):
+    """Prometheus text by default; JSON with ``?format=json`` or ``Accept: application/json``."""
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [PrometheusRenderer, JSONRenderer]
+    def get(self, request):
+        if isinstance(request.accepted_renderer, PrometheusRenderer):
+            return Response(metrics.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        return Response(metrics.snapshot())
@@ -0,0 +1,76 @@
+"""Wall time of anomaly detection on large datasets, from the columnar cache.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_anomalies [--rows 1000000 5000000] [--repeat 3]
+
+Writes a synthetic dataset's columnar cache to a temporary MEDIA_ROOT and
+times ``ensure_anomalies()`` (memory-map the columns, detect, store the
+flagged int32 indices) with z-score, IQR and per-Type threshold rules on
+every numeric column. The store is removed between repeats so each one does
+the full work.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from api.anomalies import anomalies_dir, ensure_anomalies  # noqa: E402
+from api.columnar import ColumnarWriter  # noqa: E402
+from benchmarks.synthetic import make_frame  # noqa: E402
+
+CONFIG = {
+    'zscore': 3.0,
+    'iqr': 1.5,
+    'thresholds': {
+        '*': {'Flowrate': [20.0, 220.0], 'Pressure': [0.0, 12.0], 'Temperature': [None, 180.0]},
+        'Pump': {'Pressure': [1.0, 10.0]},
+        'Reactor': {'Temperature': [None, 170.0]},
+    },
+}
+
+
+def run(sizes=(1_000_000, 5_000_000), repeat=3):
+    """``{rows: (best seconds, flagged rows, index bytes)}``."""
+    media_root = tempfile.mkdtemp(prefix='bench-anomalies-')
+    results = {}
+    try:
+        for rows in sizes:
+            content_hash = f'bench{rows}'
+            writer = ColumnarWriter(content_hash, media_root=media_root)
+            writer.append(make_frame(rows, seed=rows % 97, missing=0.01))
+            writer.close()
+            directory = anomalies_dir(content_hash, CONFIG, media_root)
+            timings = []
+            for _ in range(repeat):
+                shutil.rmtree(directory, ignore_errors=True)
+                start = time.perf_counter()
+                manifest = ensure_anomalies(content_hash, CONFIG, media_root)
+                timings.append(time.perf_counter() - start)
+            size = sum(f.stat().st_size for f in directory.glob('*.bin'))
+            results[rows] = (min(timings), manifest['flagged'], size)
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f"{'rows':>10} {'seconds':>8} {'Mrows/s':>8} {'flagged':>9} {'index KiB':>10}")
+    for rows, (seconds, flagged, size) in results.items():
+        print(f"{rows:>10} {seconds:>8.3f} {rows / seconds / 1e6:>8.1f} {flagged:>9} {size / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Throughput and tail latency of the read endpoints under WSGI vs ASGI with slow clients.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_asgi [--clients 256] [--requests 4] [--workers 8] [--bandwidth 8] [--datasets 8]
+
+The Django application is driven in-process, so only the serving model
+differs between runs:
+
+* ``wsgi``: synchronous views on a pool of ``--workers`` threads (like
+  ``gunicorn --threads``). A worker stays busy until its client has read
+  the whole response.
+* ``asgi-sync``: the same synchronous views behind ``config.asgi``.
+* ``asgi``: the async views (ASYNC_VIEWS on) behind ``config.asgi``.
+
+Each of ``--clients`` concurrent clients issues ``--requests`` requests in
+turn, cycling through summary, detail and report-file requests of the seeded
+datasets. Clients read at ``--bandwidth`` KiB/s. The response cache is
+disabled so every request reaches the database; reports are rendered once
+up front.
+
+The defaults model many slow (mobile) clients, where ASGI wins. With fast
+clients (e.g. ``--clients 64 --bandwidth 256``) WSGI is faster: Django 4.2
+runs each ``MiddlewareMixin`` middleware through a thread hop under ASGI.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client, RequestFactory  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment  # noqa: E402
+from django.urls import clear_url_caches  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks.synthetic import make_frame  # noqa: E402
+
+MODES = ('wsgi', 'asgi-sync', 'asgi')
+ENDPOINTS = ('summary', 'detail', 'report')
+
+
+def route_async_views(enabled):
+    """Re-import the URLconf so ASYNC_VIEWS takes effect."""
+    settings.ASYNC_VIEWS = enabled
+    import api.urls
+    import config.urls
+    importlib.reload(api.urls)
+    importlib.reload(config.urls)
+    clear_url_caches()
+
+
+def paths(dataset_ids, count, offset):
+    for i in range(count):
+        pk = dataset_ids[(offset + i) % len(dataset_ids)]
+        endpoint = ENDPOINTS[(offset + i) % len(ENDPOINTS)]
+        yield {'summary': f'/api/datasets/{pk}/summary/', 'detail': f'/api/datasets/{pk}/',
+               'report': f'/api/datasets/{pk}/report/file/'}[endpoint]
+
+
+def run_wsgi(dataset_ids, cookie, clients, requests, workers, bandwidth):
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def serve(path):
+        # One worker thread: run the app, then feed the body to the slow client.
+        environ = factory.get(path, HTTP_COOKIE=cookie).environ
+        status = []
+        body = handler(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+        try:
+            for chunk in body:
+                time.sleep(len(chunk) / bandwidth)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return status[0]
+
+    latencies, errors = [], []
+    pool = ThreadPoolExecutor(workers)
+
+    def client(c):
+        for path in paths(dataset_ids, requests, c):
+            start = time.perf_counter()
+            code = pool.submit(serve, path).result()
+            latencies.append(time.perf_counter() - start)
+            if code != 200:
+                errors.append(code)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    # Worker threads keep their DB connections; close them from their own threads.
+    list(pool.map(lambda _: connections.close_all(), range(workers)))
+    pool.shutdown()
+    return elapsed, latencies, errors
+
+
+def run_asgi(dataset_ids, cookie, clients, requests, bandwidth):
+    app = ASGIHandler()
+    latencies, errors = [], []
+
+    async def serve(path):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+        received = asyncio.Event()
+
+        async def receive():
+            if received.is_set():
+                await asyncio.Event().wait()  # never disconnects
+            received.set()
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        status = []
+
+        async def send(message):
+            # The slow client applies back-pressure through send().
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message.get('body'):
+                await asyncio.sleep(len(message['body']) / bandwidth)
+
+        await app(scope, receive, send)
+        return status[0]
+
+    async def client(c):
+        for path in paths(dataset_ids, requests, c):
+            start = time.perf_counter()
+            code = await serve(path)
+            latencies.append(time.perf_counter() - start)
+            if code != 200:
+                errors.append(code)
+
+    async def main():
+        await asyncio.gather(*(client(c) for c in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies, errors
+
+
+def summarize(elapsed, latencies, errors):
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {'requests_per_second': len(latencies) / elapsed, 'p50': statistics.median(ordered),
+            'p95': pct(0.95), 'p99': pct(0.99), 'errors': len(errors)}
+
+
+def run(clients=256, requests=4, workers=8, bandwidth_kib=8, datasets=8, rows=5_000, modes=MODES):
+    """``{mode: {requests_per_second, p50, p95, p99, errors}}`` (latencies in seconds)."""
+    workdir = tempfile.mkdtemp(prefix='bench-asgi-')
+    setup_test_environment()
+    db = connections['default']
+    db.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'asgi.sqlite3')
+    old_name = db.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    results = {}
+    try:
+        with override_settings(MEDIA_ROOT=os.path.join(workdir, 'media'), UPLOAD_ASYNC=False, RETENTION_KEEP=None,
+                               RETENTION_RECONCILE_INTERVAL=0, RESPONSE_CACHE_SIZE=0, ALLOWED_HOSTS=['testserver'],
+                               ASYNC_VIEWS=settings.ASYNC_VIEWS):
+            user = User.objects.create_user('bench', password='bench')
+            api = APIClient()
+            api.force_authenticate(user)
+            dataset_ids = []
+            for i in range(datasets):
+                data = make_frame(rows, seed=i).to_csv(index=False).encode()
+                pk = api.post('/api/upload/', {'file': SimpleUploadedFile(f'd{i}.csv', data)}, format='multipart').json()['id']
+                b''.join(api.get(f'/api/datasets/{pk}/report/file/').streaming_content)
+                dataset_ids.append(pk)
+            browser = Client()
+            browser.force_login(user)
+            cookie = f"{settings.SESSION_COOKIE_NAME}={browser.cookies[settings.SESSION_COOKIE_NAME].value}"
+            bandwidth = bandwidth_kib * 1024
+            for mode in modes:
+                route_async_views(mode == 'asgi')
+                if mode == 'wsgi':
+                    outcome = run_wsgi(dataset_ids, cookie, clients, requests, workers, bandwidth)
+                else:
+                    outcome = run_asgi(dataset_ids, cookie, clients, requests, bandwidth)
+                results[mode] = summarize(*outcome)
+            route_async_views(False)
+    finally:
+        connections.close_all()
+        connection.close()
+        db.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=256)
+    parser.add_argument('--requests', type=int, default=4, help="Requests per client")
+    parser.add_argument('--workers', type=int, default=8, help="WSGI worker threads")
+    parser.add_argument('--bandwidth', type=int, default=8, help="Client read speed, KiB/s")
+    parser.add_argument('--datasets', type=int, default=8)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    results = run(args.clients, args.requests, args.workers, args.bandwidth, args.datasets, modes=args.modes)
+    print(f"{args.clients} clients x {args.requests} requests at {args.bandwidth} KiB/s, {args.workers} WSGI workers")
+    print(f"{'mode':>10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, r in results.items():
+        print(f"{mode:>10} {r['requests_per_second']:>8.1f} {1000 * r['p50']:>8.1f} {1000 * r['p95']:>8.1f} "
+              f"{1000 * r['p99']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Cold and warm load time of the columnar cache vs re-parsing the CSV.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_columnar [--rows 1000000] [--columns Pressure]
+
+"cold" is the first load in a fresh process (page cache permitting); "warm"
+repeats the load in the same process. Each load sums the requested columns
+so memory-mapped pages are actually touched.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import django
+from django.conf import settings
+
+from benchmarks.synthetic import write_csv
+
+
+def _configure(media_root):
+    if not settings.configured:
+        settings.configure(MEDIA_ROOT=media_root)
+        django.setup()
+
+
+def _load(kind, path, content_hash, columns):
+    import pandas as pd
+    from api.columnar import load_columns
+    if kind == 'csv':
+        frame = pd.read_csv(path)
+        return sum(float(frame[c].sum()) for c in columns)
+    if kind == 'csv-usecols':
+        frame = pd.read_csv(path, usecols=columns)
+        return sum(float(frame[c].sum()) for c in columns)
+    arrays = load_columns(content_hash, columns)
+    return sum(float(arrays[c].sum()) for c in columns)
+
+
+def _timed(kind, path, content_hash, columns, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _load(kind, path, content_hash, columns)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _child(media_root, kind, path, content_hash, columns, repeat, queue):
+    _configure(media_root)
+    queue.put(_timed(kind, path, content_hash, columns, repeat))
+
+
+def measure(media_root, kind, path, content_hash, columns, repeat=5):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(media_root, kind, path, content_hash, columns, repeat, queue))
+    proc.start()
+    times = queue.get()
+    proc.join()
+    return times[0], min(times[1:]) if len(times) > 1 else times[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--columns', nargs='+', default=['Flowrate', 'Pressure', 'Temperature'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure(tmp)
+        from api.columnar import ColumnarWriter
+        from api.utils import parse_csv_and_summary
+        path = write_csv(os.path.join(tmp, 'equipment.csv'), args.rows)
+        content_hash = 'bench'
+        writer = ColumnarWriter(content_hash)
+        start = time.perf_counter()
+        parse_csv_and_summary(path, chunksize=100_000, sink=writer)
+        writer.close()
+        print(f"ingest + columnar write: {time.perf_counter() - start:.2f}s for {args.rows} rows")
+
+        print(f"{'source':>12} {'cold s':>9} {'warm s':>9}")
+        for kind in ('csv', 'csv-usecols', 'columnar'):
+            cold, warm = measure(tmp, kind, path, content_hash, args.columns)
+            print(f"{kind:>12} {cold:>9.4f} {warm:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Latency of the cross-dataset comparison over many stored datasets.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_compare [--datasets 100 500 1000] [--types 12] [--repeat 5]
+
+Seeds a throwaway file-backed test database with summaries of synthetic
+datasets (no CSVs are written: the comparison only reads ColumnStat and
+TypeCount rows) and times ``compare_datasets()`` over the newest N of them.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection, connections  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from api.compare import compare_datasets  # noqa: E402
+from api.models import Dataset  # noqa: E402
+from api.utils import parse_csv_and_summary  # noqa: E402
+from benchmarks.synthetic import make_frame  # noqa: E402
+
+
+def seed(count, types, rows=2_000):
+    workdir = tempfile.mkdtemp(prefix='bench-compare-csv-')
+    try:
+        for i in range(count):
+            path = os.path.join(workdir, 'd.csv')
+            make_frame(rows, seed=i, types=types).to_csv(path, index=False)
+            summary, _ = parse_csv_and_summary(path)
+            ds = Dataset.objects.create(file=f'datasets/d{i}.csv', original_filename=f'd{i}.csv')
+            ds.set_summary(summary)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(sizes=(100, 500, 1000), types=12, repeat=5):
+    """``{datasets: best seconds}`` for each size."""
+    workdir = tempfile.mkdtemp(prefix='bench-compare-')
+    setup_test_environment()
+    db = connections['default']
+    db.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'compare.sqlite3')
+    old_name = db.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    results = {}
+    try:
+        seed(max(sizes), types)
+        newest = Dataset.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True)
+        for size in sizes:
+            datasets = Dataset.objects.filter(pk__in=list(newest[:size]))
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compare_datasets(datasets)
+                timings.append(time.perf_counter() - start)
+            results[size] = min(timings)
+    finally:
+        connection.close()
+        db.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--datasets', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--types', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.datasets, args.types, args.repeat)
+    print(f"{'datasets':>9} {'ms':>9}")
+    for size, seconds in results.items():
+        print(f"{size:>9} {1000 * seconds:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
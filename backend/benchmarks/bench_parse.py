@@ -0,0 +1,69 @@
+"""Peak RSS and wall time of full-load vs streaming ``parse_csv_and_summary``.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_parse [--rows 10000 1000000 10000000] [--chunksize 100000]
+
+Each measurement runs in a fresh process so its high-water RSS reflects that run alone.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.synthetic import write_csv
+
+
+def peak_rss_mib():
+    """High-water RSS of this process; VmHWM is reset on exec, unlike ru_maxrss."""
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(path, chunksize, queue):
+    from api.utils import parse_csv_and_summary
+    start = time.perf_counter()
+    summary, _ = parse_csv_and_summary(path, chunksize=chunksize)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss_mib(), summary))
+
+
+def measure(path, chunksize):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(path, chunksize, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'mode':>10} {'wall s':>9} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = write_csv(os.path.join(tmp, f'equipment_{rows}.csv'), rows)
+            full_t, full_rss, full_summary = measure(path, None)
+            stream_t, stream_rss, stream_summary = measure(path, args.chunksize)
+            print(f"{rows:>12} {'full':>10} {full_t:>9.2f} {full_rss:>9.1f}")
+            print(f"{rows:>12} {'streaming':>10} {stream_t:>9.2f} {stream_rss:>9.1f}")
+            if full_summary['type_distribution'] != stream_summary['type_distribution']:
+                print('  !! type distribution differs between modes')
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Reports per second of ``generate_pdf_report``.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_report [--seconds 5] [--types 6 300]
+
+Each case renders the same summary repeatedly; ``--types`` sets the number
+of equipment types in the breakdown (large values exercise multi-page tables).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from api.utils import SAMPLE_ROWS, parse_csv_and_summary
+from benchmarks.synthetic import make_frame
+
+
+def make_case(types, tmp):
+    frame = make_frame(max(types * 4, SAMPLE_ROWS))
+    frame['Type'] = [f'Type-{i % types}' for i in range(len(frame))]
+    path = os.path.join(tmp, f"bench_report_{types}.csv")
+    frame.to_csv(path, index=False)
+    summary, _ = parse_csv_and_summary(path)
+    return summary, frame.head(SAMPLE_ROWS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--types', type=int, nargs='+', default=[6, 300])
+    args = parser.parse_args()
+
+    from api.utils import generate_pdf_report
+    print(f"{'types':>6} {'reports/s':>10} {'ms/report':>10} {'bytes':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for types in args.types:
+            summary, sample = make_case(types, tmp)
+            generate_pdf_report(summary, sample)  # warm-up (font loading etc.)
+            count, size, start = 0, 0, time.perf_counter()
+            while time.perf_counter() - start < args.seconds:
+                size = len(generate_pdf_report(summary, sample).read())
+                count += 1
+            elapsed = time.perf_counter() - start
+            print(f"{types:>6} {count / elapsed:>10.1f} {1000 * elapsed / count:>10.2f} {size:>8}")
+
+
+if __name__ == '__main__':
+    main()
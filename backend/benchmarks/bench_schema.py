@@ -0,0 +1,73 @@
+"""Peak RSS and wall time of schema-driven vs inferred CSV reads on wide files.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_schema [--rows 1000000] [--extra-columns 0 20 60] [--modes infer schema float32 pyarrow]
+
+Modes: ``infer`` is a plain ``pd.read_csv`` of every column with type
+inference (the pre-schema behaviour), ``schema`` reads only the summarized
+columns with fixed dtypes, ``float32`` adds float32 numerics and ``pyarrow``
+uses the pyarrow engine (skipped when pyarrow is not installed). Each read
+runs in a fresh process so its high-water RSS reflects that read alone.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+from benchmarks.bench_parse import peak_rss_mib
+from benchmarks.synthetic import write_csv
+
+MODES = ('infer', 'schema', 'float32', 'pyarrow')
+
+
+def _run(path, mode, queue):
+    import pandas as pd
+    from api.schema import CsvSchema
+    start = time.perf_counter()
+    if mode == 'infer':
+        frame = pd.read_csv(path)
+    else:
+        schema = CsvSchema.sniff(path)
+        kwargs = schema.read_kwargs(engine='pyarrow' if mode == 'pyarrow' else None, float32=mode == 'float32')
+        frame = pd.read_csv(path, **kwargs)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss_mib(), frame.memory_usage(deep=True).sum() / 1024 ** 2))
+
+
+def measure(path, mode):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(path, mode, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    from api.schema import pyarrow_available
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--extra-columns', type=int, nargs='+', default=[0, 20, 60])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes if m != 'pyarrow' or pyarrow_available()]
+    if modes != args.modes:
+        print('pyarrow is not installed; skipping the pyarrow mode')
+    print(f"{'columns':>8} {'MiB on disk':>11} {'mode':>8} {'wall s':>8} {'peak MiB':>9} {'frame MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for extra in args.extra_columns:
+            path = write_csv(os.path.join(tmp, f'wide_{extra}.csv'), args.rows, extra_columns=extra)
+            size = os.path.getsize(path) / 1024 ** 2
+            for mode in modes:
+                elapsed, rss, frame = measure(path, mode)
+                print(f"{5 + extra:>8} {size:>11.1f} {mode:>8} {elapsed:>8.2f} {rss:>9.1f} {frame:>9.1f}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Lock contention of concurrent uploads and reads on SQLite, stock vs tuned.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_sqlite [--writers 4] [--readers 8] [--seconds 10] [--modes default wal tuned]
+
+``--writers`` threads repeatedly store an upload the way the upload job does
+(insert the dataset, ``set_summary()``, ``apply_retention()``) while
+``--readers`` threads load summaries and list the newest datasets. Every
+operation is wrapped like a request (``close_old_connections()`` before and
+after), so connection reuse shows up. Modes:
+
+* ``default``: Django's stock SQLite backend (rollback journal, DEFERRED
+  transactions, 5 s busy timeout, a connection per request) with the
+  summary and the retention deletes committed separately.
+* ``wal``: ``settings.DATABASES`` (api.sqlite: IMMEDIATE transactions,
+  persistent connections) with WAL switched on as ``SQLITE_WAL=1`` does and
+  the writes still committed separately.
+* ``tuned``: ``settings.DATABASES`` with the writes grouped into one
+  transaction, as the upload job does now.
+
+Each mode runs on a fresh copy of a migrated file database. "locked" counts
+operations that failed with ``database is locked``.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import suppress
+from copy import deepcopy
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, close_old_connections, connections, transaction  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from api.models import Dataset  # noqa: E402
+from api.retention import apply_retention  # noqa: E402
+from api.utils import parse_csv_and_summary  # noqa: E402
+from benchmarks.synthetic import make_frame  # noqa: E402
+
+MODES = ('default', 'wal', 'tuned')
+STOCK = {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0, 'OPTIONS': {}}
+
+
+def use_database(config, name):
+    """Point the default connection at ``name`` with ``config`` for threads started from now on."""
+    connections.close_all()
+    settings.DATABASES = {'default': {**config, 'NAME': name}}
+    # ConnectionHandler caches its settings; drop them and this thread's connection.
+    connections._settings = None
+    connections.__dict__.pop('settings', None)
+    with suppress(AttributeError):  # not opened in this thread
+        del connections['default']
+
+
+def store_upload(summary, grouped):
+    ds = Dataset.objects.create(file='datasets/bench.csv', file_size=1, original_filename='bench.csv',
+                                status=Dataset.PROCESSING)
+    ds.status = Dataset.READY
+    if grouped:
+        with transaction.atomic():
+            ds.set_summary(summary)
+            apply_retention()
+    else:
+        ds.set_summary(summary)
+        apply_retention()
+
+
+def read_summary():
+    ds = Dataset.objects.filter(status=Dataset.READY).order_by('-uploaded_at').first()
+    if ds is not None:
+        ds.get_summary()
+    list(Dataset.objects.order_by('-uploaded_at', '-id').values('id', 'original_filename', 'total_count')[:20])
+
+
+def worker(op, deadline, latencies, failures, locked):
+    while time.perf_counter() < deadline:
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            op()
+        except OperationalError as exc:
+            if 'locked' in str(exc):
+                locked.append(1)
+            else:
+                failures.append(exc)
+        else:
+            latencies.append(time.perf_counter() - start)
+        finally:
+            close_old_connections()
+    connections.close_all()
+
+
+def summarize(latencies, seconds):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'per_second': 0.0, 'p50': 0.0, 'p99': 0.0}
+    return {'per_second': len(ordered) / seconds, 'p50': statistics.median(ordered),
+            'p99': ordered[min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))]}
+
+
+def run(writers=4, readers=8, seconds=10.0, modes=MODES):
+    """``{mode: {'writes': {...}, 'reads': {...}, 'locked': n, 'errors': n}}`` (latencies in seconds)."""
+    workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+    tuned = deepcopy(settings.DATABASES['default'])
+    tuned['OPTIONS']['pragmas']['journal_mode'] = 'wal'
+    original = settings.DATABASES
+    summary, _ = parse_csv_and_summary(_sample_csv(workdir))
+    template = os.path.join(workdir, 'template.sqlite3')
+    results = {}
+    try:
+        with override_settings(MEDIA_ROOT=os.path.join(workdir, 'media'), UPLOAD_ASYNC=False, RETENTION_KEEP=20,
+                               RETENTION_RECONCILE_INTERVAL=0, RESPONSE_CACHE_SIZE=0):
+            use_database({**tuned, **STOCK}, template)
+            call_command('migrate', verbosity=0)
+            for mode in modes:
+                name = os.path.join(workdir, f'{mode}.sqlite3')
+                shutil.copy(template, name)
+                use_database({**tuned, **STOCK} if mode == 'default' else tuned, name)
+                grouped = mode == 'tuned'
+                writes, reads, failures, locked = [], [], [], []
+                deadline = time.perf_counter() + seconds
+                threads = [threading.Thread(target=worker, args=(lambda: store_upload(summary, grouped), deadline,
+                                                                 writes, failures, locked))
+                           for _ in range(writers)]
+                threads += [threading.Thread(target=worker, args=(read_summary, deadline, reads, failures, locked))
+                            for _ in range(readers)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                results[mode] = {'writes': summarize(writes, seconds), 'reads': summarize(reads, seconds),
+                                 'locked': len(locked), 'errors': len(failures)}
+    finally:
+        use_database(original['default'], original['default']['NAME'])
+        settings.DATABASES = original
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _sample_csv(workdir):
+    path = os.path.join(workdir, 'sample.csv')
+    make_frame(1000, types=12).to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    results = run(args.writers, args.readers, args.seconds, args.modes)
+    print(f"{args.writers} writers + {args.readers} readers for {args.seconds:g}s")
+    print(f"{'mode':>8} {'writes/s':>9} {'w p50 ms':>9} {'w p99 ms':>9} {'reads/s':>8} {'r p50 ms':>9} "
+          f"{'r p99 ms':>9} {'locked':>7} {'errors':>7}")
+    for mode, r in results.items():
+        w, rd = r['writes'], r['reads']
+        print(f"{mode:>8} {w['per_second']:>9.1f} {1000 * w['p50']:>9.1f} {1000 * w['p99']:>9.1f} "
+              f"{rd['per_second']:>8.1f} {1000 * rd['p50']:>9.1f} {1000 * rd['p99']:>9.1f} "
+              f"{r['locked']:>7} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
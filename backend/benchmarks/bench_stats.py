@@ -0,0 +1,52 @@
+"""Cost of each extra statistic in ``api.stats.describe``.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_stats [--rows 5000000] [--repeat 3]
+
+Statistics are enabled cumulatively, so each line's delta is the marginal
+cost of the statistic it adds.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from api.stats import STATISTICS, describe
+from benchmarks.synthetic import make_frame
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    columns = {c: frame[c].to_numpy() for c in ('Flowrate', 'Pressure', 'Temperature')}
+    types = pd.Categorical(frame['Type'])
+
+    print(f"{args.rows} rows, {len(columns)} numeric columns")
+    print(f"{'+ statistic':>14} {'total s':>9} {'delta s':>9}")
+    previous = 0.0
+    for i in range(len(STATISTICS)):
+        include = STATISTICS[:i + 1]
+        elapsed = best_of(args.repeat, lambda: describe(columns, types, include=include))
+        print(f"{include[-1]:>14} {elapsed:>9.3f} {elapsed - previous:>9.3f}")
+        previous = elapsed
+
+    naive = best_of(args.repeat, lambda: frame.groupby('Type')[list(columns)].describe(percentiles=[.05, .5, .95]))
+    print(f"pandas groupby().describe() for comparison: {naive:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""End-to-end load test of upload -> summary -> statistics -> series -> report.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.load [--users 8] [--iterations 3] [--rows 20000]
+
+Each simulated user runs in its own thread with its own DRF test client and
+DB connection against a throwaway file-backed test database and MEDIA_ROOT.
+Every iteration uploads a distinct synthetic CSV and then reads it back
+through the API. Uploads are processed inline (UPLOAD_ASYNC off) so upload
+latency includes summarization.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from benchmarks.synthetic import make_frame  # noqa: E402
+
+STEPS = ('upload', 'summary', 'statistics', 'series', 'report', 'datasets')
+
+
+def _user_session(user, payloads, latencies, errors, barrier):
+    # Server errors (e.g. SQLite lock timeouts) count as failed steps instead of killing the user.
+    client = APIClient(raise_request_exception=False)
+    client.force_authenticate(user)
+    barrier.wait()
+    try:
+        for name, data in payloads:
+            timings = {}
+            start = time.perf_counter()
+            r = client.post('/api/upload/', {'file': SimpleUploadedFile(name, data)}, format='multipart')
+            timings['upload'] = time.perf_counter() - start
+            if r.status_code != 201:
+                errors['upload'] += 1
+                continue
+            pk = r.json()['id']
+            for step, url in (('summary', f'/api/datasets/{pk}/summary/'),
+                              ('statistics', f'/api/datasets/{pk}/statistics/'),
+                              ('series', f'/api/datasets/{pk}/series/?column=Pressure&points=500'),
+                              ('report', f'/api/datasets/{pk}/report/file/'),
+                              ('datasets', '/api/datasets/')):
+                start = time.perf_counter()
+                r = client.get(url)
+                if getattr(r, 'streaming', False):
+                    for _ in r.streaming_content:
+                        pass
+                timings[step] = time.perf_counter() - start
+                if r.status_code != 200:
+                    errors[step] += 1
+            for step, seconds in timings.items():
+                latencies[step].append(seconds)
+    finally:
+        connection.close()
+
+
+def run(users=8, iterations=3, rows=20_000):
+    """Returns per-step latency percentiles (seconds), request throughput and error counts."""
+    workdir = tempfile.mkdtemp(prefix='bench-load-')
+    setup_test_environment()
+    db = connections['default']
+    db.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'load.sqlite3')
+    old_name = db.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(MEDIA_ROOT=os.path.join(workdir, 'media'), UPLOAD_ASYNC=False,
+                               RETENTION_KEEP=None, RETENTION_RECONCILE_INTERVAL=0):
+            user = User.objects.create_user('bench', password='bench')
+            payloads = [
+                [(f'u{u}-{i}.csv', make_frame(rows, seed=u * 1000 + i).to_csv(index=False).encode())
+                 for i in range(iterations)]
+                for u in range(users)
+            ]
+            # Per-user results, merged after the run.
+            per_user = [(defaultdict(list), defaultdict(int)) for _ in range(users)]
+            barrier = threading.Barrier(users + 1)
+            threads = [threading.Thread(target=_user_session, args=(user, payloads[u], *per_user[u], barrier))
+                       for u in range(users)]
+            for t in threads:
+                t.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+    finally:
+        connection.close()
+        db.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    for user_latencies, user_errors in per_user:
+        for step, samples in user_latencies.items():
+            latencies[step].extend(samples)
+        for step, count in user_errors.items():
+            errors[step] += count
+    requests = sum(len(v) for v in latencies.values())
+    result = {'wall_seconds': elapsed, 'requests_per_second': requests / elapsed if elapsed else 0.0,
+              'errors': dict(errors), 'steps': {}}
+    for step in STEPS:
+        samples = sorted(latencies.get(step, []))
+        if samples:
+            result['steps'][step] = {
+                'p50': statistics.median(samples),
+                'p95': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+                'count': len(samples),
+            }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    result = run(args.users, args.iterations, args.rows)
+    print(f"{args.users} users x {args.iterations} uploads of {args.rows} rows: "
+          f"{result['wall_seconds']:.2f}s, {result['requests_per_second']:.1f} req/s, errors {result['errors'] or 0}")
+    print(f"{'step':>12} {'p50 ms':>9} {'p95 ms':>9} {'n':>5}")
+    for step, s in result['steps'].items():
+        print(f"{step:>12} {1000 * s['p50']:>9.1f} {1000 * s['p95']:>9.1f} {s['count']:>5}")
+
+
+if __name__ == '__main__':
+    main()
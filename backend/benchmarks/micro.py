@@ -0,0 +1,128 @@
+"""Microbenchmarks of the api utility functions.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.micro [--rows 200000] [--types 6] [--missing 0.0] [--repeat 5] [--min-time 0.1]
+
+Every case runs ``--repeat`` times on the same synthetic dataset and the
+best wall time per call is reported (noise only ever adds time). Each repeat
+calls the case until at least ``--min-time`` seconds have passed, so fast
+cases are not timed from a single call at timer and scheduler resolution.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from django.core.files import File  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from api.columnar import ColumnarWriter, load_columns  # noqa: E402
+from api.downsample import downsample  # noqa: E402
+from api.incremental import merge_summaries  # noqa: E402
+from api.stats import RunningStats, describe  # noqa: E402
+from api.utils import NUMERIC_COLS, SAMPLE_ROWS, file_sha256, generate_pdf_report, parse_csv_and_summary  # noqa: E402
+from benchmarks.synthetic import make_frame  # noqa: E402
+
+
+def repeat_times(repeat, fn, min_time=0.0):
+    """Seconds per call of each of ``repeat`` repeats."""
+    times = []
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        times.append(elapsed / calls)
+    return times
+
+
+def best_of(repeat, fn, min_time=0.0):
+    return min(repeat_times(repeat, fn, min_time))
+
+
+def cases(workdir, rows, types=None, extra_columns=0, missing=0.0):
+    """``{name: callable}`` for every benchmarked utility, sharing one synthetic dataset."""
+    frame = make_frame(rows, types=types, extra_columns=extra_columns, missing=missing)
+    path = os.path.join(workdir, 'bench.csv')
+    frame.to_csv(path, index=False)
+    summary, sample = parse_csv_and_summary(path)
+    columns = {c: frame[c].to_numpy() for c in NUMERIC_COLS}
+    type_codes = pd.Categorical(frame['Type'])
+    chunks = [frame.iloc[i:i + 50_000] for i in range(0, rows, 50_000)]
+
+    def write_columns():
+        writer = ColumnarWriter(f'bench{time.perf_counter_ns()}', media_root=workdir)
+        for chunk in chunks:
+            writer.append(chunk)
+        writer.close()
+
+    cache = ColumnarWriter('benchcache', media_root=workdir)
+    cache.append(frame)
+    cache.close()
+
+    def read_sha():
+        with open(path, 'rb') as fh:
+            return file_sha256(File(fh))
+
+    return {
+        'parse_full': lambda: parse_csv_and_summary(path),
+        'parse_streaming': lambda: parse_csv_and_summary(path, chunksize=50_000),
+        'file_sha256': read_sha,
+        'running_stats_update': lambda: [RunningStats().update(v) for v in columns.values()],
+        'describe': lambda: describe(columns, type_codes),
+        'merge_summaries': lambda: merge_summaries(summary, summary),
+        'downsample_lttb': lambda: downsample(columns['Pressure'], 1000, method='lttb'),
+        'downsample_minmax': lambda: downsample(columns['Pressure'], 1000, method='minmax'),
+        'columnar_write': write_columns,
+        'columnar_load': lambda: [float(np.sum(v)) for v in load_columns('benchcache', NUMERIC_COLS).values()],
+        'generate_pdf_report': lambda: generate_pdf_report(summary, sample.head(SAMPLE_ROWS)),
+    }
+
+
+def run_repeats(rows=200_000, repeat=5, min_time=0.1, **options):
+    """Seconds per call of every repeat of each case."""
+    workdir = tempfile.mkdtemp(prefix='bench-micro-')
+    try:
+        with override_settings(MEDIA_ROOT=workdir):
+            benchmarks = cases(workdir, rows, **options)
+            return {name: repeat_times(repeat, fn, min_time) for name, fn in benchmarks.items()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(rows=200_000, repeat=5, min_time=0.1, **options):
+    """Best seconds per call of each case."""
+    return {name: min(times) for name, times in run_repeats(rows, repeat, min_time, **options).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--types', type=int, default=None, help="Type cardinality (default: 6)")
+    parser.add_argument('--extra-columns', type=int, default=0)
+    parser.add_argument('--missing', type=float, default=0.0, help="Fraction of blank numeric cells")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1, help="Minimum seconds per repeat")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat, args.min_time, types=args.types, extra_columns=args.extra_columns, missing=args.missing)
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for name, seconds in results.items():
+        print(f"{name:>22} {1000 * seconds:>10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Benchmark suite with regression checks against a stored baseline.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.suite [--quick] [--save-baseline] [--tolerance 0.3] [--load-tolerance 0.5]
+                               [--noise 3] [--runs 1] [--only micro load]
+
+Runs the utility microbenchmarks (``benchmarks.micro``, best of repeats
+lasting at least 0.1 s each) and the end-to-end load test
+(``benchmarks.load``, median of five runs) and compares every timing with
+``benchmarks/baseline.json``. A case slower than its baseline by more than
+``--tolerance`` is flagged and the exit status is 1, unless the slowdown is
+within ``--noise`` times the case's spread when the baseline was recorded:
+how far its median repeat (or load run) landed above the fastest one, or,
+over ``--runs`` runs of the suite, how far apart the runs landed, whichever
+is larger. The load test's latency percentiles under concurrency move in
+scheduler-sized steps, so it has its own ``--load-tolerance``.
+``--save-baseline`` records the current run as the new baseline instead;
+record it with ``--runs 3`` or more so the spread covers run-to-run
+variation too.
+
+Baselines are only comparable on the machine (and with the options) they
+were recorded with. To absorb that machine being busier than when the
+baseline was recorded, a fixed reference workload is timed around every run
+and stored with the baseline, and baseline timings are scaled up by how much
+slower it ran.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+PROFILES = {
+    'full': {'micro': {'rows': 200_000, 'repeat': 5}, 'load': {'users': 8, 'iterations': 3, 'rows': 20_000},
+             'load_runs': 5},
+    'quick': {'micro': {'rows': 20_000, 'repeat': 5}, 'load': {'users': 4, 'iterations': 4, 'rows': 5_000},
+              'load_runs': 5},
+}
+
+
+def reference_seconds(repeat=7):
+    """Best wall time of a fixed NumPy + pure-Python workload, the machine's current speed."""
+    values = np.random.default_rng(0).normal(size=200_000)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        np.sort(values)
+        sum(i * i for i in range(200_000))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def spread(values):
+    """How far the median of ``values`` lies above the smallest one."""
+    return statistics.median(values) - min(values)
+
+
+def collect(profile, only):
+    """Flat ``{case: seconds}`` timings (lower is better), ``{case: seconds}``
+    spreads and load-test error counts.
+
+    Micro timings are the best repeat; the load test runs ``load_runs`` times
+    and each of its timings is the median over the runs.
+    """
+    timings, noise, errors = {}, {}, {}
+    if 'micro' in only:
+        from benchmarks import micro
+        for name, times in micro.run_repeats(**profile['micro']).items():
+            timings[f'micro.{name}'] = min(times)
+            noise[f'micro.{name}'] = spread(times)
+    if 'load' in only:
+        from benchmarks import load
+        runs = defaultdict(list)
+        for _ in range(profile['load_runs']):
+            result = load.run(**profile['load'])
+            runs['load.wall'].append(result['wall_seconds'])
+            for step, s in result['steps'].items():
+                runs[f'load.{step}.p50'].append(s['p50'])
+                runs[f'load.{step}.p95'].append(s['p95'])
+            for step, count in result['errors'].items():
+                errors[step] = errors.get(step, 0) + count
+        timings.update({case: statistics.median(values) for case, values in runs.items()})
+        noise.update({case: spread(values) for case, values in runs.items()})
+    return timings, noise, errors
+
+
+def collect_runs(profile, only, runs):
+    """``collect`` ``runs`` times: the mean reference time, the median timing
+    of each case, its largest spread (within or across runs) and the summed
+    error counts.
+
+    Each run is timed between two reference workloads and its timings are
+    rescaled to the mean reference time, so the machine getting busier
+    between runs does not count as spread.
+    """
+    results, references = [], []
+    for _ in range(runs):
+        before = reference_seconds()
+        results.append(collect(profile, only))
+        references.append((before + reference_seconds()) / 2)
+    reference = statistics.mean(references)
+    timings, noise, errors = {}, {}, {}
+    for case in results[0][0]:
+        values = [r[0][case] * reference / ref for r, ref in zip(results, references)]
+        timings[case] = statistics.median(values)
+        noise[case] = max(max(values) - min(values), max(r[1][case] for r in results))
+    for _, _, run_errors in results:
+        for step, count in run_errors.items():
+            errors[step] = errors.get(step, 0) + count
+    return reference, timings, noise, errors
+
+
+def compare(timings, baseline, tolerance, noise=None, margin=3.0, load_tolerance=None, scale=1.0):
+    """Rows of ``(case, seconds, baseline seconds or None, ratio or None, regressed)``.
+
+    Baseline seconds and spreads (``noise``, from the baseline) are
+    multiplied by ``scale`` (current / recorded reference time). A case
+    regressed when it is more than ``tolerance`` (``load_tolerance`` for
+    ``load.*`` cases, if given) slower relatively and more than ``margin``
+    times its spread slower absolutely.
+    """
+    noise = noise or {}
+    rows = []
+    for case, seconds in timings.items():
+        base = baseline[case] * scale if baseline.get(case) else None
+        ratio = seconds / base if base else None
+        allowed = load_tolerance if load_tolerance is not None and case.startswith('load.') else tolerance
+        slack = margin * noise.get(case, 0.0) * scale
+        regressed = ratio is not None and ratio > 1 + allowed and seconds - base > slack
+        rows.append((case, seconds, base, ratio, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="Smaller inputs, for a fast smoke run")
+    parser.add_argument('--only', nargs='+', choices=['micro', 'load'], default=['micro', 'load'])
+    parser.add_argument('--tolerance', type=float, default=0.3, help="Allowed slowdown before flagging (0.3 = 30%%)")
+    parser.add_argument('--load-tolerance', type=float, default=0.5,
+                        help="Allowed slowdown of load-test timings (0.5 = 50%%)")
+    parser.add_argument('--noise', type=float, default=3.0,
+                        help="Slowdowns within this many times a case's baseline spread are never flagged")
+    parser.add_argument('--runs', type=int, default=1, help="Run the suite this many times and keep the medians")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--baseline', default=BASELINE)
+    args = parser.parse_args()
+
+    profile_name = 'quick' if args.quick else 'full'
+    reference, timings, noise, errors = collect_runs(PROFILES[profile_name], args.only, args.runs)
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            stored = json.load(fh)
+    baseline = stored.get(profile_name, {}).get('timings', {})
+    baseline_noise = stored.get(profile_name, {}).get('noise', {})
+    recorded = stored.get(profile_name, {}).get('reference_seconds')
+    # Only ever relaxes the check: a lucky fast reference run must not tighten it.
+    scale = max(reference / recorded, 1.0) if recorded else 1.0
+
+    regressions = 0
+    print(f"reference workload {1000 * reference:.2f} ms" + (f", baseline scaled by {scale:.2f}" if recorded else ""))
+    print(f"{'case':>28} {'ms':>10} {'baseline':>10} {'spread':>8} {'ratio':>7}")
+    for case, seconds, base, ratio, regressed in compare(
+            timings, baseline, args.tolerance, baseline_noise, args.noise, args.load_tolerance, scale):
+        regressions += regressed
+        base_text = f"{1000 * base:>10.2f}" if base else f"{'-':>10}"
+        noise_text = f"{1000 * baseline_noise[case] * scale:>8.2f}" if case in baseline_noise else f"{'-':>8}"
+        ratio_text = f"{ratio:>7.2f}" if ratio else f"{'-':>7}"
+        print(f"{case:>28} {1000 * seconds:>10.2f} {base_text} {noise_text} {ratio_text}"
+              f"{'  REGRESSION' if regressed else ''}")
+    if errors:
+        print(f"load test errors: {errors}")
+
+    if args.save_baseline:
+        stored[profile_name] = {
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+            'reference_seconds': reference,
+            'runs': args.runs,
+            'timings': timings,
+            'noise': noise,
+        }
+        with open(args.baseline, 'w') as fh:
+            json.dump(stored, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print(f"Saved {profile_name} baseline to {args.baseline}")
+        return 0
+    if regressions or errors:
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%} ({args.load_tolerance:.0%} for the "
+              f"load test) and {args.noise:g}x the baseline spread" + (", load test errors" if errors else ""))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Synthetic equipment CSV generator used by the benchmarks.
+
+With the default arguments the frames are identical to earlier versions, so
+older benchmark numbers stay comparable. ``types`` sets the Type cardinality,
+``extra_columns`` adds unsummarized numeric columns and ``missing`` blanks
+that fraction of the numeric cells.
+"""
+import numpy as np
+import pandas as pd
+
+TYPES = ['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor', 'Condenser']
+
+
+def type_names(count=None):
+    if count is None or count == len(TYPES):
+        return TYPES
+    if count <= len(TYPES):
+        return TYPES[:count]
+    return TYPES + [f'Type{i}' for i in range(len(TYPES), count)]
+
+
+def make_frame(rows, seed=0, types=None, extra_columns=0, missing=0.0):
+    rng = np.random.default_rng(seed)
+    idx = np.arange(rows)
+    names = type_names(types)
+    types = np.array(names)[rng.integers(0, len(names), rows)]
+    frame = pd.DataFrame({
+        'Equipment Name': pd.Series(types, dtype=object) + '-' + idx.astype(str),
+        'Type': types,
+        'Flowrate': rng.normal(120, 30, rows).round(1),
+        'Pressure': rng.normal(6, 1.5, rows).round(2),
+        'Temperature': rng.normal(110, 15, rows).round(1),
+    })
+    for i in range(extra_columns):
+        frame[f'Extra{i + 1}'] = rng.normal(0, 1, rows).round(3)
+    if missing:
+        for col in frame.columns[2:]:
+            frame.loc[rng.random(rows) < missing, col] = np.nan
+    return frame
+
+
+def write_csv(path, rows, seed=0, block=1_000_000, **options):
+    """Write ``rows`` synthetic rows to ``path`` in blocks to bound generator memory.
+
+    ``options`` are passed to ``make_frame`` (types, extra_columns, missing).
+    """
+    with open(path, 'w', newline='') as fh:
+        for start in range(0, rows, block):
+            frame = make_frame(min(block, rows - start), seed=seed + start, **options)
+            frame.to_csv(fh, index=False, header=start == 0)
+    return path
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -76,11 +78,33 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+#
+# api.sqlite is Django's SQLite backend plus connection-time PRAGMAs and a
+# transaction mode (see api/sqlite/base.py). WAL lets reads run alongside the
+# single writer; it is stored in the database file itself (and adds -wal/-shm
+# files next to it), so it is opt-in with SQLITE_WAL=1 for deployments and the
+# checked-in development database is left alone. synchronous=NORMAL is durable against crashes of the process
+# (a power loss may drop the last commits); IMMEDIATE transactions queue
+# writers on the busy timeout (seconds) instead of failing on lock upgrades.
+# Connections are kept for CONN_MAX_AGE seconds instead of one per request.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'api.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                **({'journal_mode': 'wal'} if os.environ.get('SQLITE_WAL') == '1' else {}),
+                'synchronous': 'normal',
+                'cache_size': -64000,  # KiB
+                'temp_store': 'memory',
+                'mmap_size': 256 * 1024 ** 2,
+            },
+        },
     }
 }
 
@@ -127,7 +151,6 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
@@ -141,4 +164,102 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# CSV ingestion: files larger than the threshold (bytes) are streamed in
+# chunks of CSV_CHUNK_SIZE rows instead of being loaded whole.
+CSV_CHUNK_SIZE = 100_000
+CSV_STREAMING_THRESHOLD = 50 * 1024 * 1024
+
+# Upload processing (parse -> summarize -> report) runs on a local thread pool
+# and the upload returns 202 with a job id; set UPLOAD_ASYNC = False to process
+# inside the request instead.
+UPLOAD_ASYNC = True
+UPLOAD_WORKERS = 4
+# Queued jobs do not survive a restart of the server process: datasets still
+# pending/processing this many seconds after upload are marked failed (by
+# retention, the job status endpoint and the reconcile_media command) so
+# clients stop polling them. None disables this.
+UPLOAD_STALE_AFTER = 3600
+
+# Uploads are hashed (SHA-256) while being written so identical files can be
+# matched against Dataset.content_hash without re-reading them.
+FILE_UPLOAD_HANDLERS = [
+    'api.uploadhandlers.HashingMemoryFileUploadHandler',
+    'api.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Downsampled chart series (datasets/<pk>/series/): default and maximum point
+# budget per request, and how long (seconds) each result stays cached.
+SERIES_DEFAULT_POINTS = 1000
+SERIES_MAX_POINTS = 10000
+SERIES_CACHE_TIMEOUT = 3600
+
+# Batch uploads (upload/batch/) are summarized on a process pool; None uses
+# one worker per CPU core. Zip archives may expand to at most this many bytes.
+BATCH_WORKERS = None
+BATCH_MAX_UNCOMPRESSED_BYTES = 8 * 1024 ** 3
+
+# Dataset, list and summary responses carry ETags for conditional GETs; their
+# serialized payloads can also be kept in an in-process LRU of this many
+# entries (0 disables it). Each process only invalidates its own copy, so
+# other workers would keep serving stale data: only enable it when a single
+# server process handles every request and runs every upload.
+RESPONSE_CACHE_SIZE = 0
+
+# Dataset retention, applied after every upload: keep the newest
+# RETENTION_KEEP datasets, drop datasets older than RETENTION_MAX_AGE seconds
+# and the oldest ones once stored CSVs exceed RETENTION_MAX_BYTES (None
+# disables a policy). Orphaned media is swept at most every
+# RETENTION_RECONCILE_INTERVAL seconds (0 disables; see also the
+# reconcile_media management command).
+RETENTION_KEEP = 5
+RETENTION_MAX_AGE = None
+RETENTION_MAX_BYTES = None
+RETENTION_RECONCILE_INTERVAL = 3600
+
+# Request metrics are exported at /api/metrics/ (Prometheus text, or JSON with
+# ?format=json). With REQUEST_PROFILING on, requests sending an "X-Profile:
+# cprofile" (or "pyinstrument") header and "X-Profile-Token:" with
+# REQUEST_PROFILE_TOKEN are profiled with probability
+# REQUEST_PROFILE_SAMPLE_RATE and the dump is written to PROFILE_DIR.
+# Profiling is decided before authentication, so nothing is profiled while
+# the token is unset.
+REQUEST_PROFILING = False
+REQUEST_PROFILE_TOKEN = None
+REQUEST_PROFILE_SAMPLE_RATE = 0.1
+PROFILE_DIR = BASE_DIR / "profiles"
+
+# CSV reading: only the summarized columns are parsed, with fixed dtypes.
+# CSV_ENGINE = "pyarrow" parses whole (non-streamed) files on several threads
+# when pyarrow is installed; None keeps pandas' C parser. CSV_FLOAT32 parses
+# the numeric columns as float32 (about 7 significant digits), halving their
+# memory at the cost of precision in the cached columns and statistics.
+CSV_ENGINE = None
+CSV_FLOAT32 = False
+
+# Uploaded file parts sent gzip-compressed (Content-Type application/gzip or a
+# .gz name) are inflated while they stream in; this caps the inflated size.
+UPLOAD_MAX_DECOMPRESSED_BYTES = 8 * 1024 ** 3
+
+# Route the dataset detail, summary and report file endpoints to their async
+# views. Turn on when serving config.asgi (e.g. uvicorn config.asgi:application);
+# under WSGI the synchronous views are cheaper.
+ASYNC_VIEWS = False
+
+# Cross-dataset comparison (datasets/compare/) merges stored aggregates only;
+# this caps how many datasets one request may cover.
+COMPARE_MAX_DATASETS = 1000
+
+# Anomaly detection (datasets/<pk>/anomalies/ and the PDF report): rows further
+# than ANOMALY_ZSCORE standard deviations from a column's mean, outside
+# ANOMALY_IQR_K interquartile ranges beyond the quartiles, or outside the safe
+# band configured for their Type, e.g.
+#   {'*': {'Pressure': [0, 10]}, 'Reactor': {'Temperature': [None, 150]}}
+# ('*' applies to every Type without its own band; None leaves an end open).
+# With ANOMALY_DETECTION on, uploads are checked as part of processing;
+# otherwise detection runs on first request.
+ANOMALY_DETECTION = True
+ANOMALY_ZSCORE = 3.0
+ANOMALY_IQR_K = 1.5
+ANOMALY_THRESHOLDS = {}
@@ -0,0 +1,68 @@
+"""On-disk cache of API responses for the desktop client.
+
+Dataset lists and summaries are stored in a small SQLite database with the
+ETag the server sent, keyed by request URL (summaries by dataset id as
+well). The window renders cached copies immediately, revalidates them with
+``If-None-Match`` and falls back to them when the backend is unreachable.
+Only used from the GUI thread.
+"""
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".chemical-visualizer", "cache.sqlite3")
+
+Entry = namedtuple("Entry", "data etag fetched_at")
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                dataset_id INTEGER,
+                etag TEXT,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_dataset ON responses (dataset_id);
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    def get(self, url):
+        row = self.db.execute("SELECT body, etag, fetched_at FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return Entry(json.loads(row[0]), row[1], row[2])
+
+    def put(self, url, body, etag=None, dataset_id=None):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (url, dataset_id, etag, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, dataset_id, etag, body, time.time()),
+            )
+
+    def touch(self, url):
+        """Mark a cached response as revalidated now (after a 304)."""
+        with self.db:
+            self.db.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def forget_dataset(self, dataset_id):
+        with self.db:
+            self.db.execute("DELETE FROM responses WHERE dataset_id = ?", (dataset_id,))
+
+    def get_state(self, key, default=None):
+        row = self.db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def close(self):
+        self.db.close()
@@ -1,18 +1,22 @@
 import sys
-import base64
-import requests
-import pandas as pd
+import time
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QFileDialog,
-    QLineEdit, QHBoxLayout, QTextEdit, QFrame, QSizePolicy
+    QLineEdit, QHBoxLayout, QTextEdit, QFrame, QSizePolicy, QProgressBar, QCheckBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
+from cache import ResponseCache
+from network import ApiCall, ApiClient
+from preview import CsvPreview
+
 API_BASE = "http://127.0.0.1:8000/api"
+DATASET_LIST_PATH = "datasets/?fields=id,original_filename,uploaded_at"
+POLL_INTERVAL_MS = 500
 
 
 class ModernFrame(QFrame):
@@ -37,6 +41,16 @@ class MainWindow(QWidget):
         self.resize(1100, 650)
         self.setStyleSheet("background-color: #f4f6f9; font-family: Segoe UI;")
 
+        self.api = ApiClient(API_BASE)
+        # Running ApiCalls, kept referenced until they finish.
+        self.calls = set()
+        self.upload_call = None
+        self.cache = ResponseCache()
+        # Dataset whose summary is on screen; restored from the cache on startup.
+        self.current_dataset = self.cache.get_state("current_dataset")
+        self.shown_dataset = None
+        self.preview = None
+
         # Main horizontal layout
         main_layout = QHBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -72,14 +86,21 @@ class MainWindow(QWidget):
         sidebar_layout.addWidget(title)
         sidebar_layout.addSpacing(20)
 
-        btn_upload = QPushButton("Upload CSV")
-        btn_upload.clicked.connect(self.handle_upload_click)
-        sidebar_layout.addWidget(btn_upload)
+        self.btn_upload = QPushButton("Upload CSV")
+        self.btn_upload.clicked.connect(self.handle_upload_click)
+        sidebar_layout.addWidget(self.btn_upload)
 
         btn_load = QPushButton("Reload Summary")
         btn_load.clicked.connect(self.reload_summary)
         sidebar_layout.addWidget(btn_load)
 
+        sidebar_layout.addSpacing(10)
+        self.compress_box = QCheckBox("Compress uploads (gzip)")
+        self.compress_box.setChecked(self.cache.get_state("compress_uploads", True))
+        self.compress_box.toggled.connect(lambda on: self.cache.set_state("compress_uploads", on))
+        self.compress_box.setStyleSheet("color: white; font-size: 13px;")
+        sidebar_layout.addWidget(self.compress_box)
+
         sidebar_layout.addStretch()
 
         # ---------------- MAIN CONTENT ----------------
@@ -115,6 +136,39 @@ class MainWindow(QWidget):
         self.status_label.setStyleSheet("font-size: 14px; color: #1b3a57;")
         panel_layout.addWidget(self.status_label)
 
+        # Upload progress, shown while an upload is running
+        progress_row = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.setStyleSheet("""
+            QProgressBar {
+                border: 1px solid #d9e2ec;
+                border-radius: 6px;
+                background: #f7f9fc;
+                text-align: center;
+                height: 18px;
+            }
+            QProgressBar::chunk {
+                background: #1a73e8;
+                border-radius: 6px;
+            }
+        """)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setStyleSheet("""
+            QPushButton {
+                background: white;
+                color: #1b3a57;
+                border: 1px solid #c7d4e6;
+                padding: 4px 12px;
+                border-radius: 6px;
+            }
+        """)
+        self.btn_cancel.clicked.connect(self.cancel_upload)
+        progress_row.addWidget(self.progress_bar)
+        progress_row.addWidget(self.btn_cancel)
+        panel_layout.addLayout(progress_row)
+        self.set_uploading(False)
+
         # Chart area
         self.figure, self.ax = plt.subplots(figsize=(5, 3))
         self.canvas = FigureCanvas(self.figure)
@@ -140,6 +194,9 @@ class MainWindow(QWidget):
         main_layout.addWidget(sidebar)
         main_layout.addLayout(content)
 
+        # Render the last session's summary from the cache, then revalidate it.
+        QTimer.singleShot(0, self.reload_summary)
+
     # ---------------- HELPERS ----------------
     def stylize_input(self, widget):
         widget.setStyleSheet("""
@@ -155,11 +212,71 @@ class MainWindow(QWidget):
             }
         """)
 
-    def auth_header(self):
-        username = self.user_in.text()
-        password = self.pw_in.text()
-        token = base64.b64encode(f"{username}:{password}".encode()).decode()
-        return {"Authorization": f"Basic {token}"}
+    def credentials(self):
+        return (self.user_in.text(), self.pw_in.text())
+
+    def run_call(self, fn, on_success, on_failure=None):
+        """Run ``fn(call)`` on a worker thread; callbacks run on the GUI thread."""
+        self.api.auth = self.credentials()
+        call = ApiCall(fn)
+        call.succeeded.connect(on_success)
+        call.failed.connect(on_failure or self.show_error)
+        call.finished.connect(lambda: self.calls.discard(call))
+        self.calls.add(call)
+        call.start()
+        return call
+
+    def show_error(self, message):
+        self.status_label.setText("Network error")
+        self.summary_box.setPlainText(message)
+
+    def show_stale(self, entry, reason):
+        fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.fetched_at))
+        self.status_label.setText(f"Showing cached data from {fetched} ({reason})")
+
+    def fetch(self, path, on_data, dataset_id=None):
+        """GET ``path`` through the response cache.
+
+        A cached copy is rendered immediately and revalidated with
+        If-None-Match; ``on_data`` runs again only when the server has a newer
+        version. When the backend is unreachable the cached copy stays up.
+        """
+        url = self.api.url(path)
+        cached = self.cache.get(url)
+        if cached is not None:
+            on_data(cached.data)
+        headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else {}
+
+        def received(response):
+            if response.status_code == 304 and cached is not None:
+                self.cache.touch(url)
+            elif response.ok:
+                self.cache.put(url, response.text, response.headers.get("ETag"), dataset_id)
+                on_data(response.json())
+            elif response.status_code == 404 and dataset_id is not None:
+                self.cache.forget_dataset(dataset_id)
+                self.status_label.setText("Dataset no longer exists on the server")
+            elif cached is not None:
+                reason = "not signed in" if response.status_code in (401, 403) else f"server error {response.status_code}"
+                self.show_stale(cached, reason)
+            else:
+                self.status_label.setText(f"Request failed ({response.status_code})")
+                self.summary_box.setPlainText(response.text)
+
+        def failed(message):
+            if cached is not None:
+                self.show_stale(cached, "backend unreachable")
+            else:
+                self.show_error(message)
+
+        return self.run_call(lambda call: self.api.get(path, headers=headers), received, failed)
+
+    def set_uploading(self, uploading):
+        self.btn_upload.setEnabled(not uploading)
+        self.progress_bar.setVisible(uploading)
+        self.btn_cancel.setVisible(uploading)
+        if uploading:
+            self.progress_bar.setValue(0)
 
     # ---------------- LOGIC ----------------
     def handle_upload_click(self):
@@ -169,44 +286,135 @@ class MainWindow(QWidget):
 
     def upload_csv(self, filepath):
         self.status_label.setText("Uploading file...")
-
-        try:
-            files = {"file": open(filepath, "rb")}
-            response = requests.post(
-                f"{API_BASE}/upload/",
-                files=files,
-                headers=self.auth_header()
-            )
-
-            if response.status_code == 201:
+        self.set_uploading(True)
+        self.start_preview(filepath)
+        compress = self.compress_box.isChecked()
+
+        def upload(call):
+            return self.api.upload("upload/", filepath, progress=call.progress.emit, cancelled=call.is_cancelled,
+                                   compress=compress, stage=call.stage.emit)
+
+        self.upload_stage = "Uploading"
+        self.upload_call = self.run_call(upload, self.upload_finished, self.upload_failed)
+        self.upload_call.stage.connect(self.upload_stage_changed)
+        self.upload_call.progress.connect(self.upload_progress)
+        self.upload_call.cancelled.connect(self.upload_cancelled)
+
+    def upload_stage_changed(self, stage):
+        self.upload_stage = "Compressing" if stage == "compress" else "Uploading"
+        self.progress_bar.setValue(0)
+
+    def upload_progress(self, sent, total):
+        # QProgressBar values are 32-bit, so track per-mille rather than bytes.
+        self.progress_bar.setMaximum(1000)
+        self.progress_bar.setValue(int(1000 * sent / total) if total else 0)
+        self.status_label.setText(f"{self.upload_stage} file... {sent / 1024 ** 2:.1f} / {total / 1024 ** 2:.1f} MiB")
+
+    # ---------------- LOCAL PREVIEW ----------------
+    def start_preview(self, filepath):
+        """Summarize the file locally while it uploads; the server's summary replaces it."""
+        self.stop_preview()
+        preview = CsvPreview(filepath)
+        preview.partial.connect(lambda summary, fraction: self.show_preview(preview, summary, fraction))
+        preview.done.connect(lambda summary: self.show_preview(preview, summary, 1.0))
+        preview.finished.connect(lambda: self.calls.discard(preview))
+        self.calls.add(preview)
+        self.preview = preview
+        preview.start()
+
+    def stop_preview(self):
+        if self.preview is not None:
+            self.preview.cancel()
+            self.preview = None
+
+    def show_preview(self, preview, summary, fraction):
+        # Ignore late signals from a preview that was superseded or stopped.
+        if preview is self.preview:
+            self.show_summary(summary, title=f"LOCAL PREVIEW ({fraction:.0%} read)")
+
+    def cancel_upload(self):
+        if self.upload_call is not None:
+            self.upload_call.cancel()
+            self.status_label.setText("Cancelling upload...")
+
+    def upload_cancelled(self):
+        self.upload_call = None
+        self.stop_preview()
+        self.set_uploading(False)
+        self.status_label.setText("Upload cancelled")
+
+    def upload_failed(self, message):
+        self.upload_call = None
+        self.set_uploading(False)
+        self.status_label.setText("Upload error")
+        self.summary_box.setPlainText(message)
+
+    def upload_finished(self, response):
+        self.upload_call = None
+        self.set_uploading(False)
+        if response.status_code == 201:
+            self.status_label.setText("Upload successful")
+            dataset = response.json()
+            self.load_summary(dataset["id"])
+        elif response.status_code == 202:
+            self.status_label.setText("Upload accepted, processing...")
+            self.poll_status(response.json()["id"])
+        else:
+            self.status_label.setText("Upload failed")
+            self.summary_box.setPlainText(response.text)
+
+    def poll_status(self, dataset_id):
+        def status_received(response):
+            job = response.json() if response.ok else {}
+            state = job.get("status")
+            if state == "ready":
                 self.status_label.setText("Upload successful")
-                dataset = response.json()
-                self.load_summary(dataset["id"])
+                self.load_summary(dataset_id)
+            elif state == "failed":
+                self.status_label.setText("Processing failed")
+                self.summary_box.setPlainText(job.get("error", ""))
+            elif state in ("pending", "processing"):
+                QTimer.singleShot(POLL_INTERVAL_MS, lambda: self.poll_status(dataset_id))
             else:
-                self.status_label.setText("Upload failed")
-                self.summary_box.setPlainText(response.text)
+                self.status_label.setText("Status check failed")
 
-        except Exception as e:
-            self.status_label.setText("Upload error")
-            self.summary_box.setPlainText(str(e))
+        def status_failed(message):
+            self.status_label.setText("Status check error")
+            self.summary_box.setPlainText(message)
+
+        self.run_call(lambda call: self.api.get(f"datasets/{dataset_id}/status/"), status_received, status_failed)
 
     def reload_summary(self):
-        self.status_label.setText("Reload functionality can be extended.")
+        """Refresh the dataset list and show the current dataset, or the latest one."""
+        self.shown_dataset = None
+
+        def list_received(page):
+            ids = [d["id"] for d in page.get("results", [])]
+            dataset_id = self.current_dataset if self.current_dataset in ids else (ids[0] if ids else None)
+            if dataset_id is None:
+                self.status_label.setText("No datasets uploaded yet")
+            elif dataset_id != self.shown_dataset:
+                self.load_summary(dataset_id)
+
+        self.fetch(DATASET_LIST_PATH, list_received)
 
     def load_summary(self, dataset_id):
-        try:
-            response = requests.get(
-                f"{API_BASE}/datasets/{dataset_id}/summary/",
-                headers=self.auth_header()
-            )
-            if response.ok:
-                summary = response.json()
-                self.show_summary(summary)
-        except Exception as e:
-            self.summary_box.setPlainText(str(e))
+        self.stop_preview()
+        self.current_dataset = self.shown_dataset = dataset_id
+        self.cache.set_state("current_dataset", dataset_id)
+        self.fetch(f"datasets/{dataset_id}/summary/", self.show_summary, dataset_id=dataset_id)
+
+    def closeEvent(self, event):
+        for call in list(self.calls):
+            call.cancel()
+        for call in list(self.calls):
+            call.wait()
+        self.api.close()
+        self.cache.close()
+        super().closeEvent(event)
 
     # ---------------- STRUCTURED SUMMARY ----------------
-    def show_summary(self, summary):
+    def show_summary(self, summary, title="SUMMARY REPORT"):
         total = summary.get("total_count", 0)
 
         # Averages
@@ -218,7 +426,7 @@ class MainWindow(QWidget):
         dist_text = "".join([f"    • {k}: {v}\n" for k, v in dist.items()])
 
         formatted = (
-            f"SUMMARY REPORT\n"
+            f"{title}\n"
             f"----------------------------\n"
             f"Total Equipment: {total}\n\n"
             f"Averages:\n{avg_text if avg_text else '    No average data available'}\n"
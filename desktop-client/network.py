@@ -0,0 +1,230 @@
+"""Background networking for the desktop client.
+
+All HTTP runs on worker threads (``ApiCall``) so the window stays responsive.
+Calls share one pooled ``requests.Session`` with connect/read timeouts, and
+uploads stream the file from disk as a multipart body instead of loading it
+into memory, reporting progress and checking for cancellation between blocks.
+Uploads can be gzip-compressed first; the server inflates them as they arrive.
+"""
+import os
+import tempfile
+import threading
+import uuid
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PyQt5.QtCore import QThread, pyqtSignal
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# The server summarizes small files before answering an upload.
+UPLOAD_READ_TIMEOUT = 300
+POOL_SIZE = 4
+# Progress is reported at most once per block.
+PROGRESS_BLOCK = 256 * 1024
+# zlib level for compressed uploads: level 1 already shrinks typical CSVs
+# about 3x at several times the speed of the default level 6.
+GZIP_LEVEL = 1
+GZIP_BLOCK = 1024 * 1024
+
+
+class Cancelled(Exception):
+    pass
+
+
+def gzip_file(filepath, progress=None, cancelled=None, level=GZIP_LEVEL):
+    """Compress ``filepath`` to a temporary ``.gz`` file and return its path.
+
+    The caller removes the file. ``progress(read, total)`` and ``cancelled()``
+    work as for ``MultipartBody``.
+    """
+    total = os.path.getsize(filepath)
+    fd, gz_path = tempfile.mkstemp(suffix=".csv.gz")
+    deflate = zlib.compressobj(level, zlib.DEFLATED, 31)
+    done = 0
+    try:
+        with open(filepath, "rb") as src, os.fdopen(fd, "wb") as dst:
+            while True:
+                if cancelled is not None and cancelled():
+                    raise Cancelled()
+                block = src.read(GZIP_BLOCK)
+                if not block:
+                    break
+                dst.write(deflate.compress(block))
+                done += len(block)
+                if progress is not None:
+                    progress(done, total)
+            dst.write(deflate.flush())
+    except BaseException:
+        os.remove(gz_path)
+        raise
+    return gz_path
+
+
+class MultipartBody:
+    """``multipart/form-data`` body with one file field, read from disk on demand.
+
+    ``requests`` sends it with a Content-Length (from ``__len__``) and pulls it
+    through ``read()``, so only one socket block is in memory at a time.
+    ``progress(sent, total)`` is called as the body is sent; ``cancelled()``
+    returning true aborts the upload with ``Cancelled``.
+    """
+
+    def __init__(self, filepath, field="file", content_type="text/csv", progress=None, cancelled=None,
+                 filename=None):
+        boundary = uuid.uuid4().hex
+        filename = (filename or os.path.basename(filepath)).replace('"', "%22")
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+        self._file = open(filepath, "rb")
+        self._size = len(self._head) + os.fstat(self._file.fileno()).st_size + len(self._tail)
+        self._progress = progress
+        self._cancelled = cancelled
+        self._sent = 0
+        self._reported = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        while True:
+            block = self.read(PROGRESS_BLOCK)
+            if not block:
+                return
+            yield block
+
+    def read(self, size=-1):
+        if self._cancelled is not None and self._cancelled():
+            raise Cancelled()
+        start = self._sent
+        end = self._size if size is None or size < 0 else min(self._size, start + size)
+        head_end = len(self._head)
+        body_end = self._size - len(self._tail)
+        parts = []
+        if start < head_end:
+            parts.append(self._head[start:min(end, head_end)])
+        if end > head_end and start < body_end:
+            want = min(end, body_end) - max(start, head_end)
+            data = self._file.read(want)
+            if len(data) < want:
+                raise OSError("file changed size during upload")
+            parts.append(data)
+        if end > body_end:
+            parts.append(self._tail[max(start, body_end) - body_end:end - body_end])
+        self._sent = end
+        if self._progress is not None and (end - self._reported >= PROGRESS_BLOCK or end == self._size):
+            self._reported = end
+            self._progress(end, self._size)
+        return b"".join(parts)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ApiClient:
+    """Pooled, authenticated access to the backend API.
+
+    The session's connection pool is shared by every worker thread; GETs are
+    retried on connection errors and 502/503/504.
+    """
+
+    def __init__(self, base_url, pool_size=POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.auth = None
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "HEAD"}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, **kwargs):
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        return self.session.get(self.url(path), auth=self.auth, **kwargs)
+
+    def upload(self, path, filepath, progress=None, cancelled=None, compress=False, stage=None):
+        """POST ``filepath`` as the ``file`` field, gzip-compressed first if ``compress``.
+
+        ``stage(name)`` is told when compression and sending start; ``progress``
+        then counts bytes of that stage.
+        """
+        if not compress:
+            if stage is not None:
+                stage("upload")
+            return self._post_file(path, filepath, "text/csv", None, progress, cancelled)
+        if stage is not None:
+            stage("compress")
+        gz_path = gzip_file(filepath, progress, cancelled)
+        try:
+            if stage is not None:
+                stage("upload")
+            name = os.path.basename(filepath) + ".gz"
+            return self._post_file(path, gz_path, "application/gzip", name, progress, cancelled)
+        finally:
+            os.remove(gz_path)
+
+    def _post_file(self, path, filepath, content_type, filename, progress, cancelled):
+        with MultipartBody(filepath, content_type=content_type, filename=filename,
+                           progress=progress, cancelled=cancelled) as body:
+            return self.session.post(self.url(path), data=body, auth=self.auth,
+                                     headers={"Content-Type": body.content_type},
+                                     timeout=(CONNECT_TIMEOUT, UPLOAD_READ_TIMEOUT))
+
+    def close(self):
+        self.session.close()
+
+
+class ApiCall(QThread):
+    """Runs ``fn(call)`` on a worker thread and reports back through Qt signals.
+
+    ``fn`` gets the call itself so it can report ``stage`` and ``progress``
+    and poll ``is_cancelled()``. Exactly one of ``succeeded``, ``failed`` or
+    ``cancelled`` is emitted; signals are delivered on the GUI thread.
+    """
+
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    progress = pyqtSignal("qint64", "qint64")
+    stage = pyqtSignal(str)
+
+    def __init__(self, fn, parent=None):
+        super().__init__(parent)
+        self.fn = fn
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            result = self.fn(self)
+        except Exception as exc:
+            if self.is_cancelled():
+                self.cancelled.emit()
+            else:
+                self.failed.emit(str(exc) or exc.__class__.__name__)
+            return
+        if self.is_cancelled():
+            self.cancelled.emit()
+        else:
+            self.succeeded.emit(result)
@@ -0,0 +1,78 @@
+"""Local, progressive summary of a CSV while it uploads.
+
+``CsvPreview`` stream-parses the file on a worker thread, reading only the
+summarized columns, and emits running totals in the same shape as the
+server's summary so the window can render them as they grow.
+"""
+import os
+import threading
+import time
+
+import pandas as pd
+from PyQt5.QtCore import QThread, pyqtSignal
+
+NUMERIC_COLS = ["Flowrate", "Pressure", "Temperature"]
+CHUNK_ROWS = 50_000
+# Partial summaries are emitted at most this often (seconds); redrawing the
+# chart for every chunk would keep the GUI thread busy.
+EMIT_INTERVAL = 0.25
+
+
+class CsvPreview(QThread):
+    """Emits ``partial(summary, fraction_read)`` while reading, then ``done(summary)``."""
+
+    partial = pyqtSignal(object, float)
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filepath, chunk_rows=CHUNK_ROWS, parent=None):
+        super().__init__(parent)
+        self.filepath = filepath
+        self.chunk_rows = chunk_rows
+        self._cancel = threading.Event()
+        self.total_count = 0
+        self.sums = {}
+        self.counts = {}
+        self.types = {}
+
+    def cancel(self):
+        self._cancel.set()
+
+    def summary(self):
+        averages = {col: self.sums[col] / self.counts[col] for col in NUMERIC_COLS
+                    if self.counts.get(col)}
+        types = dict(sorted(self.types.items(), key=lambda kv: kv[1], reverse=True))
+        return {"total_count": self.total_count, "averages": averages, "type_distribution": types}
+
+    def update(self, chunk):
+        chunk.columns = [c.strip() for c in chunk.columns]
+        self.total_count += len(chunk)
+        for col in NUMERIC_COLS:
+            if col in chunk.columns:
+                values = pd.to_numeric(chunk[col], errors="coerce")
+                self.sums[col] = self.sums.get(col, 0.0) + float(values.sum())
+                self.counts[col] = self.counts.get(col, 0) + int(values.count())
+        if "Type" in chunk.columns:
+            for name, count in chunk["Type"].value_counts().items():
+                self.types[name] = self.types.get(name, 0) + int(count)
+
+    def run(self):
+        wanted = set(NUMERIC_COLS) | {"Type"}
+        try:
+            size = os.path.getsize(self.filepath) or 1
+            last_emit = 0.0
+            with open(self.filepath, "rb") as fh:
+                reader = pd.read_csv(fh, chunksize=self.chunk_rows, usecols=lambda c: c.strip() in wanted)
+                for chunk in reader:
+                    if self._cancel.is_set():
+                        return
+                    self.update(chunk)
+                    now = time.monotonic()
+                    if now - last_emit >= EMIT_INTERVAL:
+                        last_emit = now
+                        self.partial.emit(self.summary(), min(fh.tell() / size, 1.0))
+        except Exception as exc:
+            self.failed.emit(str(exc) or exc.__class__.__name__)
+            return
+        if not self._cancel.is_set():
+            self.done.emit(self.summary())
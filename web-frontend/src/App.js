@@ -26,13 +26,13 @@ export default function App() {
   // Load history
   const loadHistory = async () => {
     try {
-      const resp = await fetch(`${API}/datasets/`, {
+      const resp = await fetch(`${API}/datasets/?fields=id,original_filename,uploaded_at`, {
         headers: { Authorization: "Basic " + btoa(username + ":" + password) },
       });
 
       if (!resp.ok) return alert("Invalid username or password");
 
-      setDatasets(await resp.json());
+      setDatasets((await resp.json()).results);
     } catch (e) {
       alert("Error: " + e.message);
     }
@@ -53,7 +53,11 @@ export default function App() {
       headers: { Authorization: "Basic " + btoa(username + ":" + password) },
     });
 
-    if (resp.ok) {
+    if (resp.status === 202) {
+      setUploadStatus("Processing...");
+      const job = await resp.json();
+      await waitForJob(job.id);
+    } else if (resp.ok) {
       setUploadStatus("File uploaded successfully");
       loadHistory();
     } else {
@@ -61,6 +65,38 @@ export default function App() {
     }
   };
 
+  // Poll the background job until the dataset is ready
+  const waitForJob = async (id) => {
+    for (;;) {
+      const resp = await fetch(`${API}/datasets/${id}/status/`, {
+        headers: { Authorization: "Basic " + btoa(username + ":" + password) },
+      });
+      const job = resp.ok ? await resp.json() : { status: "failed" };
+
+      if (job.status === "ready") {
+        setUploadStatus("File uploaded successfully");
+        loadHistory();
+        return;
+      }
+      if (job.status === "failed") {
+        setUploadStatus("Processing failed" + (job.error ? ": " + job.error : ""));
+        return;
+      }
+      await new Promise((r) => setTimeout(r, 500));
+    }
+  };
+
+  // Reports are rendered on first request and streamed by the API
+  const openReport = async (ds) => {
+    const resp = await fetch(`${API}/datasets/${ds.id}/report/file/`, {
+      headers: { Authorization: "Basic " + btoa(username + ":" + password) },
+    });
+    if (!resp.ok) return alert("Report not available yet");
+    const url = URL.createObjectURL(await resp.blob());
+    window.open(url, "_blank", "noreferrer");
+    setTimeout(() => URL.revokeObjectURL(url), 60000);
+  };
+
   // Expand history item and fetch summary
   const toggleExpand = async (ds) => {
     // Collapse if clicked same item
@@ -211,14 +247,9 @@ export default function App() {
                   </div>
 
                   {/* PDF Button */}
-                  <a
-                    href={ds.pdf_report}
-                    target="_blank"
-                    rel="noreferrer"
-                    style={pdfButton}
-                  >
+                  <button style={pdfButton} onClick={() => openReport(ds)}>
                     View PDF Report
-                  </a>
+                  </button>
                 </div>
               )}
             </div>
@@ -304,4 +335,6 @@ const pdfButton = {
   borderRadius: 8,
   textDecoration: "none",
   fontWeight: 600,
+  border: "none",
+  cursor: "pointer",
 };